@@ -1,25 +1,70 @@
-import uvicorn
+import time, uuid, uvicorn
 
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 
-from routers.router import router
-from utils.environment import hp
+from routers.router import router, registry
+from utils.environment import hp, service_logger
+from utils import metrics
+from utils.prefork import run_prefork
+
+request_latency = metrics.registry.histogram('http_request_duration_seconds', 'HTTP request latency by route.', ('method', 'route', 'status'))
+requests_in_flight = metrics.registry.gauge('http_requests_in_flight', 'HTTP requests currently being served.')
+
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    # 지정한 모델은 서버 시작 시 백그라운드에서 미리 로드
+    registry.warmup(hp.model_warmup, background=True)
+    service_logger.start()
+    yield
+    # 큐에 남은 로그를 모두 기록하고 listener 스레드 종료
+    service_logger.stop()
 
 app = FastAPI(
     title = "AI server template",
     version = "v1.0.0",
     description = """
         여기에 서버의 설명을 작성한다.
-    """
+    """,
+    lifespan=lifespan
 )
 
+@app.middleware("http")
+async def record_request_metrics(request:Request, call_next):
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    requests_in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        requests_in_flight.dec()
+        duration = time.perf_counter() - start
+        # 경로 파라미터별로 지표가 늘어나지 않도록 라우트 템플릿을 사용
+        route = request.scope.get("route")
+        route_path = route.path if route else "unmatched"
+        request_latency.observe(duration, method=request.method, route=route_path, status=status)
+        service_logger.add_info('http', f'{request.method} {route_path} {status}',
+                                request_id=request_id, duration_ms=round(duration * 1000, 3))
+
 @app.get("/")
 async def root():
     return JSONResponse({"checkout": True, "message": "AI server."})
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(router)
 
 if __name__ == "__main__":
-    uvicorn.run("app:app", host=hp.server_host, port=hp.server_port, reload=False)
+    if hp.server_workers > 1:
+        run_prefork(app, host=hp.server_host, port=hp.server_port, workers=hp.server_workers,
+                    preload=lambda: registry.warmup(hp.model_warmup, background=False))
+    else:
+        uvicorn.run("app:app", host=hp.server_host, port=hp.server_port, reload=False)
 
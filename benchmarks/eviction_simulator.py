@@ -0,0 +1,151 @@
+"""
+접근 기록을 DBHandler에 정책별로 재생해서 hit ratio와 다시 가져와야 했던 용량(bytes fetched)을 비교.
+실제 DBHandler/SQLite 테이블을 그대로 사용하고, 파일은 크기만 가진 sparse 파일로 만들어서 디스크를 거의 쓰지 않음.
+
+    python benchmarks/eviction_simulator.py --capacity-mb 512
+    python benchmarks/eviction_simulator.py --input access.csv --capacity-mb 2048 --policies lru lfu gdsf --json
+
+--input은 key,size[,time] 헤더가 있는 CSV (size는 byte, time은 unix time 초). time이 없으면 요청마다 1초씩 증가.
+--input이 없으면 Zipf 분포의 인기 파일 요청 사이에 드물게 쓰이는 파일을 한 번씩 훑는 스캔을 섞은 합성 기록을 사용.
+"""
+import os, sys, csv, json, time, random, argparse, tempfile
+
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cores.DataBaseHandler import DBHandler
+from cores.EvictionPolicy import EVICTION_POLICIES, get_eviction_policy
+
+def load_accesses(input_path:str) -> list:
+    """
+    :return: (key, size, time) 목록
+    """
+    accesses = []
+    with open(input_path, 'r', encoding='utf-8', newline='') as f:
+        for index, row in enumerate(csv.DictReader(f)):
+            accesses.append((row['key'], int(row['size']), float(row['time']) if row.get('time') else float(index)))
+    if not accesses:
+        raise ValueError(f"{input_path} is empty.")
+    return accesses
+
+def synthetic_accesses(args) -> list:
+    # 인기 파일 objects개는 Zipf 분포로 요청되고, scan_every 요청마다 한 번도 쓰이지 않은 파일 scan_size개를 연속으로 요청
+    rng = random.Random(args.seed)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.objects)]
+    sizes = [int(rng.uniform(args.min_size_kb, args.max_size_kb) * 1024) for _ in range(args.objects)]
+    popular = rng.choices(range(args.objects), weights=weights, k=args.requests)
+
+    accesses, scan_index = [], 0
+    for index, rank in enumerate(popular):
+        accesses.append((f'voice-{rank}', sizes[rank], float(len(accesses))))
+        if args.scan_every and (index + 1) % args.scan_every == 0:
+            for _ in range(args.scan_size):
+                accesses.append((f'scan-{scan_index}', int(rng.uniform(args.min_size_kb, args.max_size_kb) * 1024), float(len(accesses))))
+                scan_index += 1
+    return accesses
+
+def replay(accesses:list, policy, capacity:int, low_water_ratio:float) -> dict:
+    clock_time = [accesses[0][2]]
+    names = {}
+    hits = misses = bytes_hit = bytes_fetched = uncacheable = 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_dir = os.path.join(temp_dir, 'files')
+        os.makedirs(file_dir)
+        db = DBHandler(db_path=os.path.join(temp_dir, 'simulation.db'),
+                       file_root_path=file_dir,
+                       maximum_disk_size=capacity,
+                       low_water_ratio=low_water_ratio,
+                       eviction_policy=policy,
+                       clock=lambda: datetime.fromtimestamp(clock_time[0]))
+        db.init_db()
+
+        start = time.perf_counter()
+        for key, size, access_time in accesses:
+            clock_time[0] = access_time
+            file_name = names.setdefault(key, f'{len(names)}.bin')
+            if db.check_and_update_file(file_name):
+                hits += 1
+                bytes_hit += size
+                continue
+
+            misses += 1
+            bytes_fetched += size
+            if size > capacity:
+                uncacheable += 1
+                continue
+            # 내용은 필요 없으므로 크기만 가진 sparse 파일로 등록
+            with open(os.path.join(file_dir, file_name), 'wb') as f:
+                f.truncate(size)
+            db.register_file(file_name)
+        elapsed = time.perf_counter() - start
+
+        db.flush()
+        db.wait_for_unlinks()
+        cached_size = db.total_size()
+        db.close()
+
+    requests = hits + misses
+    return {
+        "policy": db.eviction_policy.name,
+        "requests": requests,
+        "hits": hits,
+        "hit_ratio": hits / requests if requests else 0.0,
+        "byte_hit_ratio": bytes_hit / (bytes_hit + bytes_fetched) if bytes_hit + bytes_fetched else 0.0,
+        "bytes_fetched": bytes_fetched,
+        "uncacheable": uncacheable,
+        "cached_size": cached_size,
+        "elapsed_sec": elapsed,
+    }
+
+def make_policy(name:str, args):
+    if name == 'ttl':
+        return get_eviction_policy(name, ttl_sec=args.ttl_sec)
+    if name == 'gdsf':
+        return get_eviction_policy(name, cost=args.gdsf_cost)
+    return get_eviction_policy(name)
+
+def run(args) -> dict:
+    accesses = load_accesses(args.input) if args.input else synthetic_accesses(args)
+    capacity = int(args.capacity_mb * 1024 * 1024)
+    return {
+        "accesses": len(accesses),
+        "unique_keys": len({key for key, _, _ in accesses}),
+        "capacity_bytes": capacity,
+        "results": [replay(accesses, make_policy(name, args), capacity, args.low_water_ratio) for name in args.policies],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', default=None, help='접근 기록 CSV (key,size[,time]). 없으면 합성 기록')
+    parser.add_argument('--capacity-mb', type=float, default=256, help='캐시 용량 (maximum_disk_size)')
+    parser.add_argument('--low-water-ratio', type=float, default=0.9)
+    parser.add_argument('--policies', nargs='+', choices=sorted(EVICTION_POLICIES), default=['lru', 'lfu', 'gdsf', 'ttl'])
+    parser.add_argument('--ttl-sec', type=float, default=3600, help='TTL 정책의 만료 시간 (기록의 시간 기준)')
+    parser.add_argument('--gdsf-cost', choices=['constant', 'size'], default='constant')
+    parser.add_argument('--requests', type=int, default=20000, help='합성 기록: 인기 파일 요청 수')
+    parser.add_argument('--objects', type=int, default=2000, help='합성 기록: 인기 파일 수')
+    parser.add_argument('--zipf', type=float, default=0.9, help='합성 기록: Zipf 지수')
+    parser.add_argument('--scan-every', type=int, default=2000, help='합성 기록: 스캔 사이의 요청 수 (0이면 스캔 없음)')
+    parser.add_argument('--scan-size', type=int, default=500, help='합성 기록: 스캔 한 번에 요청하는 새 파일 수')
+    parser.add_argument('--min-size-kb', type=float, default=64)
+    parser.add_argument('--max-size-kb', type=float, default=512)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='결과를 JSON으로 출력')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"accesses: {report['accesses']}  unique keys: {report['unique_keys']}  capacity: {report['capacity_bytes'] / 1024 / 1024:.0f} MB")
+    print(f"{'policy':<8} {'hit ratio':>10} {'byte hit':>10} {'fetched(MB)':>12} {'elapsed(s)':>11}")
+    for result in report['results']:
+        print(f"{result['policy']:<8} {result['hit_ratio']:>10.3f} {result['byte_hit_ratio']:>10.3f} "
+              f"{result['bytes_fetched'] / 1024 / 1024:>12.1f} {result['elapsed_sec']:>11.2f}")
+
+if __name__ == '__main__':
+    main()
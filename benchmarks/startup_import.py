@@ -0,0 +1,72 @@
+"""
+app, worker, cores/* 모듈의 cold import 시간을 새 인터프리터에서 반복 측정.
+
+    python benchmarks/startup_import.py --repeat 5
+    python benchmarks/startup_import.py --modules utils.environment app --json
+"""
+import os, sys, json, glob, time, argparse, statistics, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def default_modules() -> list:
+    cores = sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(ROOT, 'cores', '*.py')))
+    return ['utils.environment', 'app', 'worker'] + [f'cores.{name}' for name in cores if name != '__init__']
+
+def measure_import(module:str) -> dict:
+    """
+    새 인터프리터에서 module을 import하고 wall time과 -X importtime의 누적 시간(us)을 반환.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=ROOT, capture_output=True, text=True)
+    wall_sec = time.perf_counter() - start
+
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith('import time:') and line.rsplit('|', 1)[-1].strip() == module:
+            cumulative_us = int(line.split('|')[1].strip())
+
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f'exit code {proc.returncode}'
+    return {"wall_sec": wall_sec, "import_us": cumulative_us, "error": error}
+
+def run(modules:list, repeat:int) -> dict:
+    baseline = [measure_import('sys')['wall_sec'] for _ in range(repeat)]
+    interpreter_sec = statistics.median(baseline)
+
+    results = {}
+    for module in modules:
+        samples = [measure_import(module) for _ in range(repeat)]
+        errors = [sample['error'] for sample in samples if sample['error']]
+        wall = [sample['wall_sec'] for sample in samples]
+        imports = [sample['import_us'] for sample in samples if sample['import_us'] is not None]
+        results[module] = {
+            "median_wall_ms": statistics.median(wall) * 1000,
+            "min_wall_ms": min(wall) * 1000,
+            "median_import_ms": statistics.median(imports) / 1000 if imports else None,
+            "error": errors[0] if errors else None,
+        }
+    return {"interpreter_ms": interpreter_sec * 1000, "repeat": repeat, "modules": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', nargs='*', default=None, help='측정할 모듈 (기본: app, worker, cores/*)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='결과를 JSON으로 출력')
+    args = parser.parse_args()
+
+    report = run(args.modules or default_modules(), args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"interpreter startup: {report['interpreter_ms']:.1f} ms (median of {report['repeat']})")
+    print(f"{'module':<32} {'wall(med)':>10} {'wall(min)':>10} {'import':>10}  error")
+    for module, result in report['modules'].items():
+        import_ms = f"{result['median_import_ms']:.1f}" if result['median_import_ms'] is not None else '-'
+        print(f"{module:<32} {result['median_wall_ms']:>10.1f} {result['min_wall_ms']:>10.1f} {import_ms:>10}  {result['error'] or ''}")
+
+if __name__ == '__main__':
+    main()
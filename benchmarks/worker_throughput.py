@@ -0,0 +1,172 @@
+"""
+로컬 큐(메모리 또는 SQLite)에 작업을 일정한 속도로 넣고 JobPipeline으로 처리해서 worker 처리량과 지연 시간을 측정.
+AWS 없이 worker 구조 변경(스레드 수, prefetch, 큐 가중치 등)의 효과를 비교할 때 사용.
+
+    python benchmarks/worker_throughput.py --count 500 --rate 100 --inference-ms 20
+    python benchmarks/worker_throughput.py --input jobs.jsonl --backend sqlite --inference-workers 2 --json
+    python benchmarks/worker_throughput.py --handler mymodule:handle_job
+
+--input의 각 줄은 큐에 넣을 메시지 Body(JSON)이고, --count가 줄 수보다 많으면 처음부터 반복.
+"""
+import os, sys, json, time, random, argparse, tempfile, importlib, threading, statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cores.JobPipeline import JobPipeline
+from cores.LocalQueue import InMemoryQueueBackend, SQLiteQueueBackend
+
+PRIOR_QUEUE = 'local/job_prior_queue'
+NORMAL_QUEUE = 'local/job_queue'
+
+def load_bodies(input_path:str, count:int) -> list:
+    if input_path is None:
+        return [json.dumps({"hash": str(index), "is_test": True}) for index in range(count)]
+    with open(input_path, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if not lines:
+        raise ValueError(f"{input_path} is empty.")
+    return [lines[index % len(lines)] for index in range(count)]
+
+def load_handler(spec:str, inference_ms:float) -> callable:
+    """
+    'module:function' 형식이면 해당 handler(queue_url, message)를 사용하고, 없으면 inference_ms만큼 대기하는 가짜 추론을 사용.
+    """
+    if spec:
+        module_name, _, attr = spec.partition(':')
+        return getattr(importlib.import_module(module_name), attr)
+
+    def simulated_handler(queue_url:str, message:dict):
+        time.sleep(inference_ms / 1000)
+        return message["Body"]
+    return simulated_handler
+
+def percentile(values:list, q:float) -> float:
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[index]
+
+def produce(backend, bodies:list, rate:float, priority_ratio:float, seed:int):
+    # rate가 0이면 모두 한 번에 넣고, 아니면 초당 rate개 속도로 넣음
+    rng = random.Random(seed)
+    start = time.monotonic()
+    for index, body in enumerate(bodies):
+        if rate > 0:
+            delay = start + index / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        queue_url = PRIOR_QUEUE if rng.random() < priority_ratio else NORMAL_QUEUE
+        backend.send_message(queue_url, body)
+
+def run(args) -> dict:
+    bodies = load_bodies(args.input, args.count)
+    handler = load_handler(args.handler, args.inference_ms)
+
+    temp_dir = None
+    if args.backend == 'sqlite':
+        temp_dir = tempfile.TemporaryDirectory()
+        backend = SQLiteQueueBackend(os.path.join(temp_dir.name, 'queue.db'))
+    else:
+        backend = InMemoryQueueBackend()
+
+    latencies = {PRIOR_QUEUE: [], NORMAL_QUEUE: []}
+    finished = threading.Event()
+    lock = threading.Lock()
+    done_count = 0
+
+    def mark_done():
+        nonlocal done_count
+        with lock:
+            done_count += 1
+            if done_count >= len(bodies):
+                finished.set()
+
+    def completer(queue_url:str, message:dict, result):
+        if args.completion_ms:
+            time.sleep(args.completion_ms / 1000)
+        latencies[queue_url].append(time.time() - int(message["Attributes"]["SentTimestamp"]) / 1000)
+        mark_done()
+
+    def on_error(queue_url:str, message:dict, error:Exception):
+        backend.delete_message(queue_url, message["ReceiptHandle"])
+        mark_done()
+
+    pipeline = JobPipeline(queue_client=backend,
+                           queue_urls=[PRIOR_QUEUE, NORMAL_QUEUE],
+                           handler=handler,
+                           completer=completer,
+                           on_error=on_error,
+                           queue_weights=args.queue_weights,
+                           receive_batch_size=args.receive_batch_size,
+                           wait_sec=1,
+                           inference_workers=args.inference_workers,
+                           prefetch=args.prefetch,
+                           completion_workers=args.completion_workers)
+
+    producer = threading.Thread(target=produce, args=(backend, bodies, args.rate, args.priority_ratio, args.seed), daemon=True)
+    start = time.perf_counter()
+    pipeline.start()
+    producer.start()
+    finished.wait(args.timeout)
+    elapsed = time.perf_counter() - start
+    pipeline.stop()
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+    all_latencies = latencies[PRIOR_QUEUE] + latencies[NORMAL_QUEUE]
+    report = {
+        "backend": args.backend,
+        "jobs": len(bodies),
+        "completed": len(all_latencies),
+        "failed": pipeline.failed_count,
+        "elapsed_sec": elapsed,
+        "throughput_per_sec": len(all_latencies) / elapsed if elapsed else 0.0,
+        "timed_out": not finished.is_set(),
+        "latency_ms": {},
+    }
+    for name, values in [('all', all_latencies), ('prior', latencies[PRIOR_QUEUE]), ('normal', latencies[NORMAL_QUEUE])]:
+        report["latency_ms"][name] = {
+            "count": len(values),
+            "mean": statistics.mean(values) * 1000 if values else None,
+            **{f"p{q}": percentile(values, q) * 1000 if values else None for q in (50, 90, 99)},
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', default=None, help='메시지 Body JSON lines 파일 (기본: 합성 작업)')
+    parser.add_argument('--count', type=int, default=200, help='넣을 작업 수')
+    parser.add_argument('--rate', type=float, default=0, help='초당 작업 투입 수 (0이면 한 번에 투입)')
+    parser.add_argument('--priority-ratio', type=float, default=0.2, help='우선순위 큐로 보낼 작업 비율')
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory')
+    parser.add_argument('--handler', default=None, help="실제 handler 'module:function' (기본: --inference-ms만큼 대기)")
+    parser.add_argument('--inference-ms', type=float, default=10)
+    parser.add_argument('--completion-ms', type=float, default=5, help='완료 전송 지연 (가짜)')
+    parser.add_argument('--inference-workers', type=int, default=1)
+    parser.add_argument('--completion-workers', type=int, default=4)
+    parser.add_argument('--receive-batch-size', type=int, default=10)
+    parser.add_argument('--prefetch', type=int, default=10)
+    parser.add_argument('--queue-weights', type=float, nargs=2, default=[4.0, 1.0], metavar=('PRIOR', 'NORMAL'))
+    parser.add_argument('--timeout', type=float, default=300, help='최대 측정 시간(초)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='결과를 JSON으로 출력')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"backend: {report['backend']}  jobs: {report['jobs']}  completed: {report['completed']}  failed: {report['failed']}"
+          + ("  (timed out)" if report['timed_out'] else ''))
+    print(f"elapsed: {report['elapsed_sec']:.2f} s  throughput: {report['throughput_per_sec']:.1f} jobs/s")
+    print(f"{'latency(ms)':<12} {'count':>7} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9}")
+    for name, stats in report['latency_ms'].items():
+        if not stats['count']:
+            continue
+        print(f"{name:<12} {stats['count']:>7} {stats['mean']:>9.1f} {stats['p50']:>9.1f} {stats['p90']:>9.1f} {stats['p99']:>9.1f}")
+
+if __name__ == '__main__':
+    main()
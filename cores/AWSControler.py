@@ -1,34 +1,87 @@
-import boto3
+import os, json, time, queue, threading, boto3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
 
+from cores.QueueBackend import QueueBackend
+from utils import metrics
+
+s3_transfer_seconds = metrics.registry.histogram('s3_transfer_seconds', 'S3 file transfer duration.', ('direction',))
+s3_transfer_bytes = metrics.registry.counter('s3_transfer_bytes_total', 'Bytes transferred to/from S3.', ('direction',))
+
 class S3Client:
-    def __init__(self, bucket_name, aws_access_key=None, aws_secret_key=None, region_name='us-east-1'):
+    def __init__(self, bucket_name, aws_access_key=None, aws_secret_key=None, region_name='us-east-1', client=None,
+                 chunk_size_mb:int=16, max_concurrency:int=10, transfer_workers:int=4):
         """
         S3Client 초기화. 인증 정보가 제공되지 않으면 기본 AWS 설정을 사용.
+
+        :param client: 이미 만든 boto3 s3 클라이언트 (테스트용 stub, moto 등). None이면 새로 생성.
+        :param chunk_size_mb: multipart 업로드/구간 다운로드의 청크 크기. 이보다 작은 파일은 한 번에 전송.
+        :param max_concurrency: 파일 하나를 전송할 때 동시에 보낼 청크 수.
+        :param transfer_workers: upload_many/download_many에서 동시에 전송할 파일 수.
         """
         self.bucket_name = bucket_name
-        try:
-            self.s3 = boto3.client(
-                's3',
-                aws_access_key_id=aws_access_key,
-                aws_secret_access_key=aws_secret_key,
-                region_name=region_name
-            )
-        except NoCredentialsError:
-            raise Exception("AWS 자격 증명을 찾을 수 없습니다.")
-        except PartialCredentialsError:
-            raise Exception("AWS 자격 증명이 불완전합니다.")
+        if client is not None:
+            self.s3 = client
+        else:
+            try:
+                self.s3 = boto3.client(
+                    's3',
+                    aws_access_key_id=aws_access_key,
+                    aws_secret_access_key=aws_secret_key,
+                    region_name=region_name
+                )
+            except NoCredentialsError:
+                raise Exception("AWS 자격 증명을 찾을 수 없습니다.")
+            except PartialCredentialsError:
+                raise Exception("AWS 자격 증명이 불완전합니다.")
+
+        self.chunk_size = chunk_size_mb * 1024 * 1024
+        self.max_concurrency = max(1, max_concurrency)
+        self.transfer_workers = max(1, transfer_workers)
+        self.transfer_config = TransferConfig(multipart_threshold=self.chunk_size,
+                                              multipart_chunksize=self.chunk_size,
+                                              max_concurrency=self.max_concurrency,
+                                              use_threads=True)
+        # 파일 단위 작업과 청크 단위 작업을 다른 풀에서 실행해서, 파일 작업이 자신의 청크를 기다리며 풀을 모두 점유하지 않도록 함
+        self._file_pool = None
+        self._part_pool = None
+        self._pool_lock = threading.Lock()
+        self.transfers = deque(maxlen=1000)
+
+    def _pools(self):
+        with self._pool_lock:
+            if self._file_pool is None:
+                self._file_pool = ThreadPoolExecutor(max_workers=self.transfer_workers, thread_name_prefix='s3-file')
+                self._part_pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='s3-part')
+            return self._file_pool, self._part_pool
+
+    def _record_transfer(self, direction:str, object_name:str, size:int, seconds:float) -> dict:
+        stat = {
+            "direction": direction,
+            "key": object_name,
+            "bytes": size,
+            "seconds": seconds,
+            "mb_per_sec": size / (1024 * 1024) / seconds if seconds > 0 else 0.0,
+        }
+        self.transfers.append(stat)
+        s3_transfer_seconds.observe(seconds, direction=direction)
+        s3_transfer_bytes.inc(size, direction=direction)
+        return stat
 
     def upload_file(self, file_path, object_name=None):
         """
-        S3 버킷에 파일 업로드.
+        S3 버킷에 파일 업로드. chunk_size보다 큰 파일은 multipart로 여러 청크를 동시에 업로드.
         """
         if object_name is None:
             object_name = file_path.split('/')[-1]  # 기본적으로 파일 이름을 S3 키로 사용
 
         try:
-            self.s3.upload_file(file_path, self.bucket_name, object_name)
-            print(f"파일 업로드 성공: {object_name}")
+            start = time.perf_counter()
+            self.s3.upload_file(file_path, self.bucket_name, object_name, Config=self.transfer_config)
+            stat = self._record_transfer('upload', object_name, os.path.getsize(file_path), time.perf_counter() - start)
+            print(f"파일 업로드 성공: {object_name} ({stat['bytes']} bytes, {stat['mb_per_sec']:.1f} MB/s)")
             return True
         except FileNotFoundError:
             print("파일을 찾을 수 없습니다.")
@@ -36,41 +89,195 @@ class S3Client:
             print(f"클라이언트 에러 발생: {e}")
         return False
 
+    def head_object(self, object_name:str) -> dict:
+        """
+        객체의 크기와 ETag 조회. 객체가 없으면 None.
+
+        :return: {"size": int, "etag": str}
+        """
+        try:
+            response = self.s3.head_object(Bucket=self.bucket_name, Key=object_name)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {"size": response['ContentLength'], "etag": response['ETag'].strip('"')}
+
     def download_file(self, object_name, file_path):
         """
-        S3 버킷에서 파일 다운로드.
+        S3 버킷에서 파일 다운로드. chunk_size보다 큰 객체는 byte-range 요청을 동시에 보내서 받은 뒤,
+        모두 받으면 임시 파일(.part)을 file_path로 교체하므로 중간에 실패해도 불완전한 파일이 남지 않음.
+        모든 range 요청은 처음 조회한 ETag로 IfMatch를 걸어서, 받는 도중 객체가 바뀌면 두 버전이 섞이지 않고 실패함.
         """
+        part_path = f'{file_path}.part'
+        futures = []
+        completed = False
         try:
-            self.s3.download_file(self.bucket_name, object_name, file_path)
-            print(f"파일 다운로드 성공: {file_path}")
+            start = time.perf_counter()
+            head = self.s3.head_object(Bucket=self.bucket_name, Key=object_name)
+            size, etag = head['ContentLength'], head['ETag']
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+            if size <= self.chunk_size:
+                self._download_range(object_name, part_path, 0, size - 1, etag)
+            else:
+                _, part_pool = self._pools()
+                futures = [part_pool.submit(self._download_range, object_name, part_path, offset, min(offset + self.chunk_size, size) - 1, etag)
+                           for offset in range(0, size, self.chunk_size)]
+                for future in futures:
+                    future.result()
+            os.replace(part_path, file_path)
+            completed = True
+            stat = self._record_transfer('download', object_name, size, time.perf_counter() - start)
+            print(f"파일 다운로드 성공: {file_path} ({size} bytes, {stat['mb_per_sec']:.1f} MB/s)")
             return True
         except FileNotFoundError:
             print("저장 경로가 올바르지 않습니다.")
         except ClientError as e:
             print(f"클라이언트 에러 발생: {e}")
+        finally:
+            if not completed:
+                # 한 청크가 실패하면 남은 청크는 취소하고, 이미 실행 중인 청크가 끝난 뒤 임시 파일 삭제 (timeout 등 모든 예외)
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+                if os.path.exists(part_path):
+                    os.remove(part_path)
         return False
 
-    def list_files(self, prefix=''):
+    def _download_range(self, object_name:str, part_path:str, start:int, end:int, etag:str=None):
+        if end < start:
+            return
+        extra = {'IfMatch': etag} if etag else {}
+        body = self.s3.get_object(Bucket=self.bucket_name, Key=object_name, Range=f'bytes={start}-{end}', **extra)['Body']
+        # 청크마다 파일을 따로 열어서 각자의 위치에 씀
+        with open(part_path, 'r+b') as f:
+            f.seek(start)
+            for chunk in iter(lambda: body.read(1024 * 1024), b''):
+                f.write(chunk)
+
+    def upload_many(self, items:list) -> dict:
+        """
+        여러 파일을 공유 스레드 풀에서 동시에 업로드.
+
+        :param items: (file_path, object_name) 목록.
+        :return: {object_name: 성공 여부}.
+        """
+        file_pool, _ = self._pools()
+        futures = {object_name: file_pool.submit(self.upload_file, file_path, object_name) for file_path, object_name in items}
+        return {object_name: future.result() for object_name, future in futures.items()}
+
+    def download_many(self, items:list) -> dict:
+        """
+        여러 객체를 공유 스레드 풀에서 동시에 다운로드.
+
+        :param items: (object_name, file_path) 목록.
+        :return: {object_name: 성공 여부}.
+        """
+        file_pool, _ = self._pools()
+        futures = {object_name: file_pool.submit(self.download_file, object_name, file_path) for object_name, file_path in items}
+        return {object_name: future.result() for object_name, future in futures.items()}
+
+    def transfer_stats(self) -> dict:
+        """
+        최근 전송 기록의 방향별 합계와 평균 처리량.
+        """
+        summary = {}
+        for stat in list(self.transfers):
+            entry = summary.setdefault(stat["direction"], {"count": 0, "bytes": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["bytes"] += stat["bytes"]
+            entry["seconds"] += stat["seconds"]
+        for entry in summary.values():
+            entry["mb_per_sec"] = entry["bytes"] / (1024 * 1024) / entry["seconds"] if entry["seconds"] > 0 else 0.0
+        return summary
+
+    def _iter_pages(self, prefix:str, delimiter:str=None, page_size:int=1000):
+        # continuation token을 따라가며 list_objects_v2 응답을 한 페이지씩 반환
+        kwargs = {"Bucket": self.bucket_name, "Prefix": prefix, "MaxKeys": page_size}
+        if delimiter:
+            kwargs["Delimiter"] = delimiter
+        while True:
+            response = self.s3.list_objects_v2(**kwargs)
+            yield response
+            if not response.get('IsTruncated'):
+                break
+            kwargs["ContinuationToken"] = response['NextContinuationToken']
+
+    @staticmethod
+    def _page_objects(response:dict) -> list:
+        return [{"key": obj['Key'], "size": obj['Size'], "etag": obj['ETag'].strip('"')} for obj in response.get('Contents', [])]
+
+    def list_files(self, prefix='', parallel:bool=False, delimiter:str='/', max_workers:int=8, page_size:int=1000):
         """
-        S3 버킷 내 파일 목록 가져오기.
+        S3 버킷 내 파일 목록을 {"key", "size", "etag"} 형태로 하나씩 반환하는 generator.
+        1000개 단위 페이지를 continuation token으로 끝까지 따라가고, 한 번에 최대 몇 페이지만 메모리에 유지.
+
+        :param parallel: True면 prefix 바로 아래의 하위 prefix(delimiter 기준)를 여러 스레드에서 동시에 조회.
+                         이 경우 반환 순서는 키 순서가 아님.
+        :param max_workers: parallel 모드에서 동시에 조회할 하위 prefix 수.
         """
+        if not parallel:
+            for response in self._iter_pages(prefix, page_size=page_size):
+                yield from self._page_objects(response)
+            return
+        yield from self._list_parallel(prefix, delimiter, max_workers, page_size)
+
+    def _list_parallel(self, prefix:str, delimiter:str, max_workers:int, page_size:int):
+        # prefix 바로 아래의 파일은 바로 반환하고, 하위 prefix 목록을 모음
+        sub_prefixes = []
+        for response in self._iter_pages(prefix, delimiter=delimiter, page_size=page_size):
+            yield from self._page_objects(response)
+            sub_prefixes += [common['Prefix'] for common in response.get('CommonPrefixes', [])]
+        if not sub_prefixes:
+            return
+
+        # 조회 스레드가 소비 속도보다 앞서 나가지 않도록 대기열 크기를 제한
+        pages = queue.Queue(maxsize=max_workers * 2)
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def walk(sub_prefix:str):
+            try:
+                for response in self._iter_pages(sub_prefix, page_size=page_size):
+                    if not put(self._page_objects(response)):
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='s3-list')
         try:
-            response = self.s3.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
-            if 'Contents' in response:
-                files = [obj['Key'] for obj in response['Contents']]
-                print(f"파일 목록: {files}")
-                return files
-            else:
-                print("파일이 없습니다.")
-                return []
-        except ClientError as e:
-            print(f"클라이언트 에러 발생: {e}")
-            return []
+            for sub_prefix in sub_prefixes:
+                pool.submit(walk, sub_prefix)
+            remaining = len(sub_prefixes)
+            while remaining:
+                item = pages.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            # 소비 쪽이 중간에 멈추거나 오류가 나면 남은 조회를 취소
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
 
-class SQSClient:
-    def __init__(self, bucket_name, aws_access_key=None, aws_secret_key=None, region_name='us-east-1'):
+class SQSClient(QueueBackend):
+    def __init__(self, bucket_name=None, aws_access_key=None, aws_secret_key=None, region_name='us-east-1'):
         """
-        S3Client 초기화. 인증 정보가 제공되지 않으면 기본 AWS 설정을 사용.
+        SQSClient 초기화. 인증 정보가 제공되지 않으면 기본 AWS 설정을 사용.
         """
         self.bucket_name = bucket_name
         try:
@@ -85,25 +292,83 @@ class SQSClient:
         except PartialCredentialsError:
             raise Exception("AWS 자격 증명이 불완전합니다.")
         
-    def recevie_message(self, queue_url:str, max_message_num:int=1, wait_sec:int=10):
+    def recevie_message(self, queue_url:str, max_message_num:int=1, wait_sec:int=10, visibility_timeout:int=None):
+        """
+        :param visibility_timeout: 받은 메시지가 다른 worker에게 보이지 않는 시간. None이면 큐 설정값 사용.
+        """
+        kwargs = {}
+        if visibility_timeout is not None:
+            kwargs["VisibilityTimeout"] = visibility_timeout
         response = self.sqs.receive_message(
             QueueUrl=queue_url,
             MaxNumberOfMessages=max_message_num,
-            WaitTimeSeconds=wait_sec
+            WaitTimeSeconds=wait_sec,
+            AttributeNames=["ApproximateReceiveCount", "SentTimestamp"],
+            **kwargs
         )
         return response
     
     def send_message(self, queue_url:str, message_body:dict):
+        """
+        :param message_body: dict이면 JSON으로 변환, str이면 그대로 전송 (dead-letter로 원본 Body를 옮길 때).
+        """
         self.sqs.send_message(
             QueueUrl=queue_url,
-            MessageBody=json.dumps(message_body)
+            MessageBody=message_body if isinstance(message_body, str) else json.dumps(message_body)
         )
     
+    def send_message_batch(self, queue_url:str, message_bodies:list):
+        """
+        메시지를 10개씩 묶어서 전송.
+        """
+        for start in range(0, len(message_bodies), 10):
+            self.sqs.send_message_batch(
+                QueueUrl=queue_url,
+                Entries=[{"Id": str(index), "MessageBody": body if isinstance(body, str) else json.dumps(body)}
+                         for index, body in enumerate(message_bodies[start:start + 10])]
+            )
+
     def delete_message(self, queue_url:str, receipt_handle):
         self.sqs.delete_message(
             QueueUrl=queue_url,
             ReceiptHandle=receipt_handle
         )
+
+    def delete_message_batch(self, queue_url:str, receipt_handles:list) -> list:
+        """
+        최대 10개의 메시지를 한 번의 요청으로 삭제.
+
+        :return: 삭제에 실패한 receipt handle 목록.
+        """
+        if not receipt_handles:
+            return []
+        response = self.sqs.delete_message_batch(
+            QueueUrl=queue_url,
+            Entries=[{"Id": str(index), "ReceiptHandle": receipt_handle} for index, receipt_handle in enumerate(receipt_handles)]
+        )
+        return [receipt_handles[int(failed["Id"])] for failed in response.get("Failed", [])]
+
+    def change_message_visibility(self, queue_url:str, receipt_handle:str, timeout_sec:int):
+        self.sqs.change_message_visibility(
+            QueueUrl=queue_url,
+            ReceiptHandle=receipt_handle,
+            VisibilityTimeout=timeout_sec
+        )
+
+    def change_message_visibility_batch(self, queue_url:str, receipt_handles:list, timeout_sec:int) -> list:
+        """
+        최대 10개 메시지의 visibility timeout을 한 번의 요청으로 변경.
+
+        :return: 변경에 실패한 receipt handle 목록.
+        """
+        if not receipt_handles:
+            return []
+        response = self.sqs.change_message_visibility_batch(
+            QueueUrl=queue_url,
+            Entries=[{"Id": str(index), "ReceiptHandle": receipt_handle, "VisibilityTimeout": timeout_sec}
+                     for index, receipt_handle in enumerate(receipt_handles)]
+        )
+        return [receipt_handles[int(failed["Id"])] for failed in response.get("Failed", [])]
     
 
 # 사용 예제
@@ -124,4 +389,5 @@ if __name__ == "__main__":
     s3_client.download_file('s3_key/remote_file.txt', 'local_path/to_save_file.txt')
 
     # 파일 목록 조회
-    s3_client.list_files('s3_key/')
+    for obj in s3_client.list_files('s3_key/'):
+        print(obj["key"], obj["size"], obj["etag"])
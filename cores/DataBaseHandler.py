@@ -1,195 +1,583 @@
 import os
+import json
+import uuid
+import queue
+import shutil
 import sqlite3
+import atexit
+import threading
 from datetime import datetime
+from contextlib import contextmanager
+from collections import OrderedDict
+
+from cores.EvictionPolicy import get_eviction_policy
 
 class DBHandler:
-    def __init__(self, db_path: str, file_root_path: str, maximum_disk_size: int = 5 * 1024 * 1024 * 1024):
+    def __init__(self, db_path: str, file_root_path: str, maximum_disk_size: int = 5 * 1024 * 1024 * 1024,
+                 busy_timeout_sec: float = 30, cache_size_kb: int = 8 * 1024, low_water_ratio: float = 0.9,
+                 memory_items: int = 100000, flush_interval_ms: float = 500, flush_max_items: int = 1000,
+                 eviction_policy=None, clock: callable = datetime.now):
+        """
+        :param busy_timeout_sec: 다른 프로세스가 쓰기 lock을 잡고 있을 때 기다릴 최대 시간.
+        :param cache_size_kb: 연결마다 사용할 SQLite 페이지 캐시 크기.
+        :param low_water_ratio: 용량을 넘으면 maximum_disk_size * low_water_ratio 이하가 될 때까지 한 번에 삭제.
+        :param memory_items: check_and_update_file이 DB 조회 없이 응답하도록 메모리에 유지할 파일 이름 수. 0이면 사용하지 않음.
+        :param flush_interval_ms: 메모리에 모아 둔 last_used 갱신을 DB에 반영하는 주기.
+                                  프로세스가 비정상 종료되면 이 시간 동안의 사용 기록만 유실됨.
+        :param flush_max_items: 모아 둔 갱신이 이 개수를 넘으면 주기를 기다리지 않고 반영.
+        :param eviction_policy: 삭제 순서를 정하는 정책. 'lru'(기본), 'lfu', 'gdsf', 'ttl' 또는 cores.EvictionPolicy의 객체.
+        :param clock: 현재 시각을 반환하는 함수. 접근 기록을 재생하는 시뮬레이션에서 기록의 시각을 사용할 때 교체.
+        """
         self.db_path = db_path
         self.file_root_path = file_root_path
         self.max_total_size = maximum_disk_size
+        self.low_water_size = int(maximum_disk_size * low_water_ratio)
+        # 삭제 대상 파일은 이 폴더로 옮긴 뒤 백그라운드 스레드에서 지움 (file_root_path 밖에 있어야 함)
+        self.trash_path = os.path.join(os.path.dirname(os.path.abspath(db_path)), '.evicted')
+        self.busy_timeout_sec = busy_timeout_sec
+        self.cache_size_kb = cache_size_kb
+        self.memory_items = memory_items
+        self.flush_interval_sec = flush_interval_ms / 1000
+        self.flush_max_items = max(1, flush_max_items)
+        self.eviction_policy = get_eviction_policy(eviction_policy)
+        self.clock = clock
+
+        # 등록된 파일 이름 -> 파일 경로. 조회는 여기서 처리하고, 사용 기록 (last_used, hit 수)은 _pending_usage에 모았다가 한꺼번에 DB에 씀
+        self._memory = OrderedDict()
+        self._pending_usage = {}
+        self._memory_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flush_thread = None
+
+        # 연결은 스레드마다 하나씩 유지하고, 같은 프로세스 안의 쓰기는 lock으로 순서를 정해서 SQLITE_BUSY를 피함
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._pid = os.getpid()
+        self._unlink_queue = None
+        self._unlink_thread = None
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # fork된 자식에서는 부모가 연 연결과 스레드를 쓰지 않고 새로 만듦
+            self._local = threading.local()
+            self._write_lock = threading.RLock()
+            self._unlink_queue = None
+            self._unlink_thread = None
+            self._memory_lock = threading.Lock()
+            self._flush_event = threading.Event()
+            self._flush_thread = None
+            self._pid = os.getpid()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        현재 스레드의 연결을 반환. 처음 호출할 때 WAL 모드와 pragma를 설정해서 연결을 만들고 이후에는 재사용.
+        """
+        self._check_fork()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_sec, isolation_level=None)
+            # WAL: 읽기가 쓰기를 막지 않아 여러 API worker가 같은 DB를 공유할 수 있음
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL에서는 NORMAL이어도 DB가 깨지지 않고, 커밋마다 fsync하지 않음
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """
+        쓰기 트랜잭션. BEGIN IMMEDIATE로 시작해서 다른 프로세스와 lock을 다투다 중간에 실패하지 않도록 함.
+        """
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        """
+        현재 스레드의 연결을 닫음.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
 
-    def init_db(self, reset: bool = False):
+    def init_db(self, reset: bool = False, incremental_scan: bool = True):
         """
         데이터베이스 초기화
         :param reset: True일 경우 기존 데이터베이스 파일을 삭제하고 새로 생성.
+        :param incremental_scan: register_existing_files를 incremental 모드로 실행할지 여부.
         """
+        if reset:
+            with self._memory_lock:
+                self._memory.clear()
+                self._pending_usage.clear()
         if reset and os.path.exists(self.db_path):
+            self.close()
             os.remove(self.db_path)
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(self.db_path + suffix):
+                    os.remove(self.db_path + suffix)
             print(f"기존 데이터베이스 파일 삭제: {self.db_path}")
 
-        self.conn = sqlite3.connect(self.db_path)
-        cursor = self.conn.cursor()
+        with self._transaction() as cursor:
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reference_voice_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_name TEXT NOT NULL UNIQUE,
+                last_used DATETIME NOT NULL,
+                file_size INTEGER,
+                directory TEXT,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                priority REAL
+            )
+            """)
+            # 이전 버전에서 만든 테이블에는 없는 컬럼 추가
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(reference_voice_files)")]
+            if 'directory' not in columns:
+                cursor.execute("ALTER TABLE reference_voice_files ADD COLUMN directory TEXT")
+            if 'hit_count' not in columns:
+                cursor.execute("ALTER TABLE reference_voice_files ADD COLUMN hit_count INTEGER NOT NULL DEFAULT 0")
+            if 'priority' not in columns:
+                cursor.execute("ALTER TABLE reference_voice_files ADD COLUMN priority REAL")
+
+            cursor.execute("CREATE INDEX IF NOT EXISTS file_name_idx ON reference_voice_files (file_name)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS last_used_idx ON reference_voice_files (last_used)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS directory_idx ON reference_voice_files (directory)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS priority_idx ON reference_voice_files (priority, last_used)")
+
+            # register_existing_files가 바뀌지 않은 폴더를 건너뛸 수 있도록 마지막으로 스캔한 폴더의 mtime과 하위 폴더 목록을 저장
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scanned_directories (
+                directory TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                subdirectories TEXT NOT NULL
+            )
+            """)
 
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS reference_voice_files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            file_name TEXT NOT NULL UNIQUE,
-            last_used DATETIME NOT NULL,
-            file_size INTEGER
-        )
-        """)
+            # 전체 파일 크기를 매번 SUM으로 계산하지 않도록 합계를 메타데이터 행에 유지
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cache_metadata (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+            """)
 
-        cursor.execute("CREATE INDEX IF NOT EXISTS file_name_idx ON reference_voice_files (file_name)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS last_used_idx ON reference_voice_files (last_used)")
-        self.conn.commit()
+            # 정책이 바뀌었으면 모든 파일의 priority를 새 정책의 계산식으로 다시 계산
+            cursor.execute("SELECT value FROM cache_metadata WHERE key = 'eviction_policy'")
+            row = cursor.fetchone()
+            if row is None or row[0] != self.eviction_policy.name:
+                # inflation은 정책마다 단위가 다르므로 초기화
+                cursor.execute("DELETE FROM cache_metadata WHERE key = 'inflation'")
+                cursor.execute(f"UPDATE reference_voice_files SET priority = {self.eviction_policy.priority_sql('hit_count')}")
+                cursor.execute("INSERT OR REPLACE INTO cache_metadata (key, value) VALUES ('eviction_policy', ?)", (self.eviction_policy.name,))
 
         # 파일 루트 경로에 있는 파일들 등록
-        self.register_existing_files()
-
-        self.conn.close()
-
-    def register_existing_files(self):
-        """
-        file_root_path에 있는 모든 파일을 데이터베이스에 등록.
-        """        
-        self.conn = sqlite3.connect(self.db_path)
-        cursor = self.conn.cursor()
-
-        # 루트 경로의 모든 파일 탐색
-        for root, _, files in os.walk(self.file_root_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_size = os.path.getsize(file_path)
-                # 이미 등록된 파일인지 확인
-                cursor.execute("SELECT id FROM reference_voice_files WHERE file_name = ?", (file,))
-                if cursor.fetchone() is None:
-                    now = datetime.now()
-                    # 파일 등록
-                    cursor.execute("""
-                    INSERT INTO reference_voice_files (file_name, last_used, file_size)
-                    VALUES (?, ?, ?)
-                    """, (file, now, file_size))
-                    # print(f"파일 등록 완료: {file}, 크기: {file_size} bytes")
-
-        self.conn.commit()
-        self.conn.close()
+        self.register_existing_files(incremental=incremental_scan)
+
+        # 이전 실행에서 지우지 못한 파일 정리
+        if os.path.isdir(self.trash_path):
+            for name in os.listdir(self.trash_path):
+                self._queue_unlink(os.path.join(self.trash_path, name))
+
+    def register_existing_files(self, incremental: bool = False):
+        """
+        file_root_path에 있는 모든 파일을 데이터베이스에 등록하고, 디스크에서 사라진 파일의 행은 삭제.
+        os.scandir의 stat 결과를 그대로 사용하고, 등록/삭제는 한 트랜잭션에서 executemany로 처리.
+
+        :param incremental: True면 mtime이 마지막 스캔과 같은 폴더는 다시 읽지 않음.
+                            폴더의 mtime은 파일이 추가/삭제/이름 변경될 때만 바뀌므로, 제자리에서 덮어써서 크기만 바뀐 파일은 반영되지 않음
+                            (register_file로 등록한 파일은 그때 크기가 갱신됨).
+        """
+        previous = {}
+        if incremental:
+            for directory, mtime_ns, subdirectories in self._connection().execute(
+                    "SELECT directory, mtime_ns, subdirectories FROM scanned_directories"):
+                previous[directory] = (mtime_ns, json.loads(subdirectories))
+        trash_path = os.path.abspath(self.trash_path)
+
+        scanned_files, scanned_directories, changed_directories = [], [], []
+        visited = set()
+        pending = ['']
+        while pending:
+            directory = pending.pop()
+            directory_path = os.path.join(self.file_root_path, directory)
+            try:
+                # 스캔 도중 바뀐 내용을 다음 스캔에서 놓치지 않도록 mtime은 목록을 읽기 전에 가져옴
+                mtime_ns = os.stat(directory_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            visited.add(directory)
+
+            saved = previous.get(directory)
+            if saved is not None and saved[0] == mtime_ns:
+                pending.extend(saved[1])
+                continue
+
+            subdirectories = []
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if os.path.abspath(entry.path) != trash_path:
+                            subdirectories.append(os.path.join(directory, entry.name))
+                    elif entry.is_file():
+                        scanned_files.append((entry.name, entry.stat().st_size, directory))
+            pending.extend(subdirectories)
+            changed_directories.append(directory)
+            scanned_directories.append((directory, mtime_ns, json.dumps(subdirectories)))
+
+        now = self.clock()
+        removed = []
+        with self._transaction() as cursor:
+            # 이미 등록된 파일은 그대로 두고 새 파일만 등록
+            cursor.executemany("""
+            INSERT OR IGNORE INTO reference_voice_files (file_name, last_used, file_size, directory)
+            VALUES (?, ?, ?, ?)
+            """, [(file_name, now, file_size, directory) for file_name, file_size, directory in scanned_files])
+            cursor.execute(f"UPDATE reference_voice_files SET priority = {self.eviction_policy.priority_sql('hit_count')} WHERE priority IS NULL")
+            # print(f"파일 등록 완료: {len(scanned_files)}개")
+
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS scanned_files (file_name TEXT PRIMARY KEY, directory TEXT)")
+            cursor.execute("DELETE FROM scanned_files")
+            cursor.executemany("INSERT OR IGNORE INTO scanned_files (file_name, directory) VALUES (?, ?)",
+                               [(file_name, directory) for file_name, _, directory in scanned_files])
+            cursor.execute("""
+            UPDATE reference_voice_files SET directory = (SELECT directory FROM scanned_files WHERE scanned_files.file_name = reference_voice_files.file_name)
+            WHERE file_name IN (SELECT file_name FROM scanned_files)
+            """)
+
+            # 다시 읽은 폴더(incremental이 아니면 전체)와 사라진 폴더에 속했는데 이번 스캔에서 보이지 않은 행 삭제
+            if incremental:
+                stale_directories = changed_directories + [directory for directory in previous if directory not in visited]
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS stale_directories (directory TEXT PRIMARY KEY)")
+                cursor.execute("DELETE FROM stale_directories")
+                cursor.executemany("INSERT OR IGNORE INTO stale_directories (directory) VALUES (?)",
+                                   [(directory,) for directory in stale_directories])
+                missing_condition = "(directory IN (SELECT directory FROM stale_directories) OR directory IS NULL)"
+            else:
+                missing_condition = "1"
+            cursor.execute(f"""
+            SELECT file_name FROM reference_voice_files
+            WHERE {missing_condition} AND file_name NOT IN (SELECT file_name FROM scanned_files)
+            """)
+            removed = [row[0] for row in cursor.fetchall()]
+            cursor.executemany("DELETE FROM reference_voice_files WHERE file_name = ?", [(file_name,) for file_name in removed])
+
+            if not incremental:
+                cursor.execute("DELETE FROM scanned_directories")
+            else:
+                cursor.executemany("DELETE FROM scanned_directories WHERE directory = ?",
+                                   [(directory,) for directory in previous if directory not in visited])
+            cursor.executemany("INSERT OR REPLACE INTO scanned_directories (directory, mtime_ns, subdirectories) VALUES (?, ?, ?)",
+                               scanned_directories)
+
+            self._recompute_total_size(cursor)
+
+        self._forget(removed)
+        if removed:
+            print(f"디스크에 없는 파일 {len(removed)}개를 데이터베이스에서 삭제")
+
+    def _recompute_total_size(self, cursor: sqlite3.Cursor) -> int:
+        cursor.execute("SELECT COALESCE(SUM(file_size), 0) FROM reference_voice_files")
+        total_size = cursor.fetchone()[0]
+        cursor.execute("INSERT OR REPLACE INTO cache_metadata (key, value) VALUES ('total_size', ?)", (total_size,))
+        return total_size
+
+    def _add_total_size(self, cursor: sqlite3.Cursor, delta: int) -> int:
+        cursor.execute("UPDATE cache_metadata SET value = value + ? WHERE key = 'total_size'", (delta,))
+        cursor.execute("SELECT value FROM cache_metadata WHERE key = 'total_size'")
+        row = cursor.fetchone()
+        return row[0] if row else self._recompute_total_size(cursor)
+
+    def total_size(self) -> int:
+        """
+        등록된 파일 크기의 합계 (byte).
+        """
+        row = self._connection().execute("SELECT value FROM cache_metadata WHERE key = 'total_size'").fetchone()
+        return row[0] if row else 0
 
     def check_and_update_file(self, file_name: str) -> bool:
         """
         파일 경로를 확인하고, 데이터베이스에 존재 여부와 상태를 업데이트.
-        
+        최근 조회한 파일은 메모리에서 바로 응답하고, last_used와 hit_count 갱신은 모아서 flush_interval_ms마다 DB에 반영.
+
         :param file_name: 확인할 파일 이름.
-        :return: 파일이 존재하면 True, 존재하지 않으면 False
+        :return: 파일이 존재하면 파일 경로 (하위 폴더에 있으면 directory 컬럼을 반영), 존재하지 않으면 False
         """
-        self.conn = sqlite3.connect(self.db_path)
-        cursor = self.conn.cursor()
-
         # 현재 시간 가져오기
-        now = datetime.now()
-
-        # DB에서 파일 존재 여부 확인
-        cursor.execute("SELECT id FROM reference_voice_files WHERE file_name = ?", (file_name,))
-        result = cursor.fetchone()
-
-        if result:
-            # 파일이 이미 존재하면 last_used 업데이트
-            cursor.execute("UPDATE reference_voice_files SET last_used = ? WHERE file_name = ?", (now, file_name))
-            self.conn.commit()
-            # print(f"파일 업데이트 완료: {file_name}")
-            self.conn.close()
+        now = self.clock()
+
+        if self.memory_items > 0:
+            with self._memory_lock:
+                file_path = self._memory.get(file_name)
+            # 같은 DB를 공유하는 다른 프로세스가 삭제했을 수 있으므로 메모리 hit도 파일이 남아 있는지 확인하고, 없으면 DB로 확인
+            if file_path is not None and os.path.isfile(file_path):
+                with self._memory_lock:
+                    self._memory[file_name] = file_path
+                    self._memory.move_to_end(file_name)
+                    self._add_pending_usage(file_name, now, 1)
+                    flush_now = len(self._pending_usage) >= self.flush_max_items
+                self._schedule_flush(flush_now)
+                return file_path
+            if file_path is not None:
+                self._forget([file_name])
+
+            # 메모리에 없으면 DB에서 확인. 사용 기록은 항상 남기고, 파일이 실제로 있을 때만 메모리에 올림
+            row = self._connection().execute("SELECT directory FROM reference_voice_files WHERE file_name = ?", (file_name,)).fetchone()
+            found = row is not None
+            if found:
+                file_path = self._file_path(file_name, row[0])
+                with self._memory_lock:
+                    self._add_pending_usage(file_name, now, 1)
+                if os.path.isfile(file_path):
+                    self._remember(file_name, file_path)
+                self._schedule_flush(False)
+        else:
+            # 존재 확인과 사용 기록 업데이트를 한 문장(autocommit)으로 처리. 갱신된 행이 있으면 존재
+            conn = self._connection()
+            with self._write_lock:
+                # RETURNING 결과를 끝까지 읽어야 문장이 끝나고 autocommit됨
+                rows = conn.execute(self._usage_update_sql() + " RETURNING directory",
+                                    {"last_used": now, "hits": 1, "file_name": file_name}).fetchall()
+            found = len(rows) > 0
+            if found:
+                file_path = self._file_path(file_name, rows[0][0])
+
+        if found:
             # 파일 경로 반환
-            return os.path.join(self.file_root_path, file_name)
+            return file_path
         else:
             # 파일이 존재하지 않으면 False 반환
             # print(f"파일이 데이터베이스에 존재하지 않습니다: {file_name}")
-            self.conn.close()
             return False
 
+    def _file_path(self, file_name: str, directory: str = None) -> str:
+        # register_existing_files는 하위 폴더의 파일을 이름(basename)과 directory로 나눠 저장하고,
+        # register_file은 file_root_path 기준 상대 경로를 이름으로 저장하므로 두 경우 모두 같은 경로가 되도록 함
+        if directory:
+            return os.path.join(self.file_root_path, directory, os.path.basename(file_name))
+        return os.path.join(self.file_root_path, file_name)
+
+    def _remember(self, file_name: str, file_path: str):
+        if self.memory_items <= 0:
+            return
+        with self._memory_lock:
+            self._memory[file_name] = file_path
+            self._memory.move_to_end(file_name)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _add_pending_usage(self, file_name: str, last_used: datetime, hits: int):
+        # _memory_lock을 잡은 상태에서 호출
+        previous = self._pending_usage.get(file_name)
+        if previous is not None:
+            last_used, hits = max(last_used, previous[0]), hits + previous[1]
+        self._pending_usage[file_name] = (last_used, hits)
+
+    def _usage_update_sql(self) -> str:
+        return f"""
+        UPDATE reference_voice_files
+        SET last_used = :last_used, hit_count = hit_count + :hits, priority = {self.eviction_policy.priority_sql('hit_count + :hits')}
+        WHERE file_name = :file_name
+        """
+
+    def _forget(self, file_names: list):
+        with self._memory_lock:
+            for file_name in file_names:
+                self._memory.pop(file_name, None)
+                self._pending_usage.pop(file_name, None)
+
+    def _schedule_flush(self, flush_now: bool):
+        self._check_fork()
+        if self._flush_thread is None:
+            with self._write_lock:
+                if self._flush_thread is None:
+                    self._flush_thread = threading.Thread(target=self._flush_loop, name='db-flush', daemon=True)
+                    self._flush_thread.start()
+                    atexit.register(self.flush)
+        if flush_now:
+            self._flush_event.set()
+
+    def _flush_loop(self):
+        while True:
+            self._flush_event.wait(self.flush_interval_sec)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"사용 기록 반영 실패: {e}")
+
+    def flush(self):
+        """
+        메모리에 모아 둔 사용 기록(last_used, hit_count, priority) 갱신을 한 트랜잭션으로 DB에 반영.
+        """
+        if not self._pending_usage:
+            return
+        with self._transaction() as cursor:
+            self._write_pending_usage(cursor)
+
+    def _write_pending_usage(self, cursor: sqlite3.Cursor):
+        with self._memory_lock:
+            pending, self._pending_usage = self._pending_usage, {}
+        if not pending:
+            return
+        try:
+            cursor.executemany(self._usage_update_sql(),
+                               [{"last_used": last_used, "hits": hits, "file_name": file_name}
+                                for file_name, (last_used, hits) in pending.items()])
+        except BaseException:
+            # 반영하지 못한 갱신은 다음 flush에서 다시 시도 (그 사이 쌓인 갱신과 합침)
+            with self._memory_lock:
+                for file_name, (last_used, hits) in pending.items():
+                    self._add_pending_usage(file_name, last_used, hits)
+            raise
+
     def register_file(self, file_name: str):
         """
-        파일을 데이터베이스에 등록하고, 전체 크기가 임계치를 초과하면 오래된 파일 삭제.
+        파일을 데이터베이스에 등록하고, 전체 크기가 임계치를 초과하면 eviction_policy 순서로 파일 삭제.
+        삭제는 low-water 크기까지 한 트랜잭션에서 처리하고, 실제 파일 삭제는 백그라운드 스레드에서 실행.
 
         :param file_name: 등록할 파일 명
         """
         file_path = os.path.join(self.file_root_path, file_name)
-        self.conn = sqlite3.connect(self.db_path)
-        cursor = self.conn.cursor()
 
         # 파일 크기 및 현재 시간 가져오기
-        now = datetime.now()
+        now = self.clock()
         file_size = os.path.getsize(file_path)
 
-        # 파일이 이미 존재하는지 확인
-        cursor.execute("SELECT id FROM reference_voice_files WHERE file_name = ?", (file_name,))
-        result = cursor.fetchone()
+        evicted, trash_file_paths = [], []
+        with self._transaction() as cursor:
+            # 파일이 이미 존재하면 이전 크기를 합계에서 빼고 last_used, file_size 업데이트
+            cursor.execute("SELECT file_size FROM reference_voice_files WHERE file_name = ?", (file_name,))
+            result = cursor.fetchone()
+            previous_size = (result[0] or 0) if result else 0
 
-        if result:
-            # 파일이 존재할 경우 last_used, file_size 업데이트
-            cursor.execute("""
-            UPDATE reference_voice_files 
-            SET last_used = ?, file_size = ? 
-            WHERE file_name = ?
-            """, (now, file_size, file_name))
-            # print(f"파일 업데이트 완료: {file_name}, 크기: {file_size} bytes")
-        else:
-            # 파일이 존재하지 않을 경우 새로 등록
             cursor.execute("""
-            INSERT INTO reference_voice_files (file_name, last_used, file_size)
-            VALUES (?, ?, ?)
-            """, (file_name, now, file_size))
+            INSERT INTO reference_voice_files (file_name, last_used, file_size, directory)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(file_name) DO UPDATE SET last_used = excluded.last_used, file_size = excluded.file_size,
+                                                 directory = excluded.directory
+            """, (file_name, now, file_size, os.path.dirname(file_name)))
+            cursor.execute(f"UPDATE reference_voice_files SET priority = {self.eviction_policy.priority_sql('hit_count')} WHERE file_name = ?",
+                           (file_name,))
             # print(f"파일 등록 완료: {file_name}, 크기: {file_size} bytes")
 
-        self.conn.commit()
-
-        # 전체 파일 크기 계산
-        cursor.execute("SELECT SUM(file_size) FROM reference_voice_files")
-        total_size = cursor.fetchone()[0] or 0
-
-        # 임계치를 초과하는 경우 오래된 파일 삭제
-        while total_size > self.max_total_size:
-            cursor.execute("""
-            SELECT file_name, file_size FROM reference_voice_files 
-            ORDER BY last_used ASC LIMIT 1
-            """)
-            oldest_file = cursor.fetchone()
-
-            if oldest_file:
-                oldest_file_name, oldest_file_size = oldest_file
-
-                # 실제 파일 삭제
-                oldest_file_path = os.path.join(self.file_root_path, oldest_file_name)
-                if os.path.exists(oldest_file_path):
-                    os.remove(oldest_file_path)
-                    # print(f"오래된 파일 삭제: {oldest_file_path}")
+            # 전체 파일 크기 갱신 (테이블 전체를 다시 읽지 않음)
+            total_size = self._add_total_size(cursor, file_size - previous_size)
+
+            # 임계치를 초과하는 경우 low-water 크기가 될 때까지 한 번에 삭제 (만료 시간이 있는 정책이면 만료된 파일도 삭제)
+            bytes_to_free = total_size - self.low_water_size if total_size > self.max_total_size else 0
+            if bytes_to_free > 0 or self.eviction_policy.expire_before(now) is not None:
+                # 메모리에만 있는 사용 기록을 먼저 반영해야 최근에 쓴 파일이 지워지지 않음
+                self._write_pending_usage(cursor)
+                candidates, _, max_priority = self.eviction_policy.select(cursor, file_name, bytes_to_free, now)
+
+                # 실제 파일은 trash 폴더로 옮기기만 하고 삭제는 백그라운드에서 처리.
+                # 옮기는 것은 쓰기 lock을 잡은 트랜잭션 안에서 해야, 같은 이름을 다시 등록하는 다른 스레드/프로세스의 새 파일을 옮기지 않음.
+                # 옮기지 못한 파일은 행을 남겨서 DB와 디스크가 어긋나지 않도록 하고, 다음 등록 때 다시 시도
+                freed = 0
+                for evicted_file_name, directory, evicted_file_size in candidates:
+                    try:
+                        trash_file_path = self._move_to_trash(evicted_file_name, directory)
+                    except OSError as e:
+                        print(f"파일 삭제 실패: {evicted_file_name}, {e}")
+                        continue
+                    evicted.append(evicted_file_name)
+                    freed += evicted_file_size or 0
+                    if trash_file_path:
+                        trash_file_paths.append(trash_file_path)
 
                 # 데이터베이스에서 파일 정보 삭제
-                cursor.execute("DELETE FROM reference_voice_files WHERE file_name = ?", (oldest_file_name,))
-                self.conn.commit()
-
-                # 총 크기 업데이트
-                total_size -= oldest_file_size
-
-        self.conn.close()
+                cursor.executemany("DELETE FROM reference_voice_files WHERE file_name = ?", [(name,) for name in evicted])
+                self._add_total_size(cursor, -freed)
+                if self.eviction_policy.uses_inflation and max_priority is not None:
+                    cursor.execute("INSERT OR REPLACE INTO cache_metadata (key, value) VALUES ('inflation', ?)", (max_priority,))
+
+        self._forget(evicted)
+        self._remember(file_name, file_path)
+        for trash_file_path in trash_file_paths:
+            self._queue_unlink(trash_file_path)
+
+    def _move_to_trash(self, file_name: str, directory: str = None):
+        file_path = self._file_path(file_name, directory)
+        if not os.path.exists(file_path):
+            return None
+        os.makedirs(self.trash_path, exist_ok=True)
+        trash_file_path = os.path.join(self.trash_path, f"{uuid.uuid4().hex}-{os.path.basename(file_name)}")
+        try:
+            os.replace(file_path, trash_file_path)
+            return trash_file_path
+        except OSError:
+            # 다른 파일 시스템이라 옮길 수 없으면 바로 삭제
+            os.remove(file_path)
+            return None
+
+    def _queue_unlink(self, path: str):
+        self._check_fork()
+        if self._unlink_thread is None:
+            with self._write_lock:
+                if self._unlink_thread is None:
+                    self._unlink_queue = queue.Queue()
+                    self._unlink_thread = threading.Thread(target=self._unlink_loop, args=(self._unlink_queue,),
+                                                           name='db-unlink', daemon=True)
+                    self._unlink_thread.start()
+        self._unlink_queue.put(path)
+
+    def _unlink_loop(self, unlink_queue: queue.Queue):
+        while True:
+            path = unlink_queue.get()
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+                # print(f"오래된 파일 삭제: {path}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"파일 삭제 실패: {path}, {e}")
+            finally:
+                unlink_queue.task_done()
+
+    def wait_for_unlinks(self):
+        """
+        백그라운드에서 삭제 중인 파일이 모두 지워질 때까지 대기.
+        """
+        if self._unlink_queue is not None:
+            self._unlink_queue.join()
 
     def delete_file(self, file_name: str) -> bool:
         """
         파일 이름을 입력받아 데이터베이스와 실제 경로에서 삭제.
-        
+
         :param file_name: 삭제할 파일 이름
         :return: 성공적으로 삭제되면 True, 파일이 없으면 False
         """
-        file_path = os.path.join(self.file_root_path, file_name)
-        self.conn = sqlite3.connect(self.db_path)
-        cursor = self.conn.cursor()
-
-        # 파일 존재 여부 확인
-        cursor.execute("SELECT id FROM reference_voice_files WHERE file_name = ?", (file_name,))
-        result = cursor.fetchone()
-
-        if result:
-            # 실제 파일 삭제
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"파일 삭제 완료: {file_path}")
-
-            # 데이터베이스에서 파일 정보 삭제
-            cursor.execute("DELETE FROM reference_voice_files WHERE file_name = ?", (file_name,))
-            self.conn.commit()
+        with self._transaction() as cursor:
+            cursor.execute("SELECT file_size, directory FROM reference_voice_files WHERE file_name = ?", (file_name,))
+            result = cursor.fetchone()
+            found = result is not None
+            if found:
+                file_path = self._file_path(file_name, result[1])
+                # 데이터베이스에서 파일 정보 삭제하고 합계에서 크기를 뺌
+                cursor.execute("DELETE FROM reference_voice_files WHERE file_name = ?", (file_name,))
+                self._add_total_size(cursor, -(result[0] or 0))
+                # 실제 파일 삭제 (register_file과 같은 이유로 트랜잭션 안에서)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                    print(f"파일 삭제 완료: {file_path}")
+
+        if found:
+            self._forget([file_name])
             print(f"데이터베이스에서 파일 정보 삭제 완료: {file_name}")
-
-            self.conn.close()
             return True
         else:
             print(f"파일이 데이터베이스에 존재하지 않습니다: {file_name}")
-            self.conn.close()
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,132 @@
+import sqlite3
+
+from datetime import datetime, timedelta
+
+class EvictionPolicy:
+    """
+    DBHandler가 용량을 넘었을 때 어떤 파일부터 지울지 정하는 전략.
+    reference_voice_files의 각 행은 last_used, hit_count, priority를 가지고, 하위 클래스는 priority 계산식과 삭제 순서를 정함.
+
+    priority_sql은 SQL UPDATE 문 안에서 계산되므로 컬럼(hit_count, file_size)과 inflation 값(:inflation 대신 서브쿼리)만 사용할 수 있음.
+    uses_inflation이 True인 정책은 삭제할 때마다 삭제된 파일의 가장 큰 priority를 inflation으로 저장해서,
+    오래전에 많이 쓰였지만 지금은 쓰이지 않는 파일의 priority가 새 파일보다 점점 낮아지도록 함(aging).
+    """
+    name = 'lru'
+    order_by = 'last_used ASC'
+    uses_inflation = False
+
+    def priority_sql(self, hit_count_sql: str) -> str:
+        """
+        :param hit_count_sql: 갱신 후의 hit_count를 나타내는 SQL 식 (예: 'hit_count + :hits').
+        :return: 새 priority를 계산하는 SQL 식.
+        """
+        return '0'
+
+    def expire_before(self, now: datetime):
+        """
+        이 시각보다 last_used가 오래된 파일은 용량과 관계없이 삭제. None이면 만료 없음.
+        """
+        return None
+
+    def select(self, cursor: sqlite3.Cursor, exclude_file_name: str, bytes_to_free: int, now: datetime):
+        """
+        bytes_to_free 이상을 확보할 때까지(그리고 만료된 파일이 남지 않을 때까지) order_by 순서로 삭제할 파일을 고름.
+
+        :return: ((file_name, directory, file_size) 목록, 확보되는 크기, 삭제되는 파일 중 가장 큰 priority)
+        """
+        evicted, freed, max_priority = [], 0, None
+        expire_before = self.expire_before(now)
+        if bytes_to_free <= 0:
+            # 용량은 충분하고 만료된 파일만 지우면 되는 경우, 만료된 파일이 없으면 정렬 조회를 하지 않음
+            if expire_before is None or cursor.execute("SELECT 1 FROM reference_voice_files WHERE last_used < ? AND file_name != ? LIMIT 1",
+                                                       (expire_before, exclude_file_name)).fetchone() is None:
+                return evicted, freed, max_priority
+        cursor.execute(f"""
+        SELECT file_name, directory, file_size, priority, last_used < ? FROM reference_voice_files
+        WHERE file_name != ?
+        ORDER BY {self.order_by}
+        """, (expire_before, exclude_file_name))
+        while True:
+            rows = cursor.fetchmany(256)
+            if not rows:
+                break
+            for file_name, directory, file_size, priority, expired in rows:
+                if freed >= bytes_to_free and not expired:
+                    return evicted, freed, max_priority
+                evicted.append((file_name, directory, file_size))
+                freed += file_size or 0
+                if priority is not None and (max_priority is None or priority > max_priority):
+                    max_priority = priority
+        return evicted, freed, max_priority
+
+class LRUPolicy(EvictionPolicy):
+    """
+    마지막 사용 시각이 오래된 파일부터 삭제 (기본값).
+    """
+    name = 'lru'
+
+class LFUPolicy(EvictionPolicy):
+    """
+    사용 횟수가 적은 파일부터 삭제하는 LFU with Dynamic Aging.
+    priority = inflation + (hit_count + 1). 한 번 스캔된 파일은 priority가 낮아 자주 쓰이는 파일보다 먼저 삭제되고,
+    inflation이 올라가면서 과거에만 많이 쓰인 파일도 결국 삭제됨.
+    """
+    name = 'lfu'
+    order_by = 'priority ASC, last_used ASC'
+    uses_inflation = True
+
+    def priority_sql(self, hit_count_sql: str) -> str:
+        return f"{INFLATION_SQL} + ({hit_count_sql}) + 1"
+
+class GDSFPolicy(EvictionPolicy):
+    """
+    GreedyDual-Size-Frequency. priority = inflation + (hit_count + 1) * cost / file_size.
+    크기가 큰 파일일수록 먼저 삭제해서 같은 용량에 더 많은 파일을 유지 (hit ratio 우선).
+
+    :param cost: 파일을 다시 가져오는 비용. 'constant'면 1 (hit ratio 최대화), 'size'면 file_size (byte hit ratio 최대화, LFU와 같아짐).
+    """
+    name = 'gdsf'
+    order_by = 'priority ASC, last_used ASC'
+    uses_inflation = True
+
+    def __init__(self, cost: str = 'constant'):
+        if cost not in ('constant', 'size'):
+            raise ValueError(f"Unknown GDSF cost: {cost}")
+        self.cost = cost
+
+    def priority_sql(self, hit_count_sql: str) -> str:
+        cost_sql = 'MAX(COALESCE(file_size, 1), 1)' if self.cost == 'size' else '1.0'
+        return f"{INFLATION_SQL} + (({hit_count_sql}) + 1) * {cost_sql} / MAX(COALESCE(file_size, 1), 1)"
+
+class TTLPolicy(EvictionPolicy):
+    """
+    ttl_sec 동안 사용되지 않은 파일은 용량과 관계없이 다음 등록 때 삭제하고, 그래도 용량을 넘으면 LRU 순서로 삭제.
+    """
+    name = 'ttl'
+
+    def __init__(self, ttl_sec: float = 7 * 24 * 60 * 60):
+        self.ttl_sec = ttl_sec
+
+    def expire_before(self, now: datetime):
+        return now - timedelta(seconds=self.ttl_sec)
+
+INFLATION_SQL = "COALESCE((SELECT value FROM cache_metadata WHERE key = 'inflation'), 0)"
+
+EVICTION_POLICIES = {
+    'lru': LRUPolicy,
+    'lfu': LFUPolicy,
+    'gdsf': GDSFPolicy,
+    'ttl': TTLPolicy,
+}
+
+def get_eviction_policy(policy=None, **kwargs) -> EvictionPolicy:
+    """
+    정책 이름('lru', 'lfu', 'gdsf', 'ttl') 또는 EvictionPolicy 객체를 받아 EvictionPolicy 객체를 반환. None이면 LRU.
+    """
+    if policy is None:
+        return LRUPolicy()
+    if isinstance(policy, EvictionPolicy):
+        return policy
+    if policy not in EVICTION_POLICIES:
+        raise ValueError(f"Unknown eviction policy: {policy}. Choose one of {sorted(EVICTION_POLICIES)}.")
+    return EVICTION_POLICIES[policy](**kwargs)
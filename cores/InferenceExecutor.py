@@ -0,0 +1,86 @@
+import asyncio
+
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+class ExecutorBusyError(Exception):
+    def __init__(self, retry_after_sec:int):
+        super().__init__(f"Inference queue is full. Retry after {retry_after_sec} seconds.")
+        self.retry_after_sec = retry_after_sec
+
+class InferenceExecutor:
+    def __init__(self, pool_type:str='thread', pool_size:int=1, queue_size:int=16, retry_after_sec:int=1, initializer:callable=None):
+        """
+        블로킹 추론 코드를 이벤트 루프 밖의 풀에서 실행하고, 동시 요청 수를 제한하는 실행 계층.
+
+        :param pool_type: 'thread' 또는 'process'. process 모드에서 실행 함수와 인자는 pickle 가능해야 함.
+        :param pool_size: 동시에 추론을 실행할 worker 수.
+        :param queue_size: 실행 중인 요청 외에 대기할 수 있는 최대 요청 수. 초과하면 ExecutorBusyError 발생.
+        :param retry_after_sec: 거절 시 클라이언트에게 전달할 Retry-After 값(초).
+        :param initializer: process 모드에서 각 worker 프로세스 시작 시 호출할 함수 (모델 로드 등).
+        """
+        if pool_type not in ('thread', 'process'):
+            raise ValueError(f"Unsupported pool_type: {pool_type}")
+
+        self.pool_type = pool_type
+        self.pool_size = max(1, int(pool_size))
+        self.queue_size = max(0, int(queue_size))
+        self.retry_after_sec = retry_after_sec
+        self.initializer = initializer
+
+        self._pool = None
+        self.in_flight = 0
+        self.rejected_count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.pool_size + self.queue_size
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.pool_size)
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        요청 하나를 수용. 실행 중 + 대기 중 요청 수가 capacity에 도달하면 즉시 ExecutorBusyError 발생.
+        """
+        if self.in_flight >= self.capacity:
+            self.rejected_count += 1
+            raise ExecutorBusyError(self.retry_after_sec)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    async def run(self, fn:callable, *args):
+        """
+        fn(*args)를 풀에서 실행하고 결과를 기다림. 이벤트 루프는 블로킹되지 않음.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+
+    def stats(self) -> dict:
+        return {
+            "pool_type": self.pool_type,
+            "pool_size": self.pool_size,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected_count": self.rejected_count,
+        }
+
+    def shutdown(self, wait:bool=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    def _get_pool(self):
+        # 풀은 처음 사용할 때 생성 (import 시점에 worker를 띄우지 않도록)
+        if self._pool is None:
+            if self.pool_type == 'process':
+                self._pool = ProcessPoolExecutor(max_workers=self.pool_size, initializer=self.initializer)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='inference')
+        return self._pool
@@ -0,0 +1,147 @@
+import os, json, time, sqlite3, threading
+
+from collections import OrderedDict
+
+from utils import metrics
+
+dedup_requests = metrics.registry.counter('worker_dedup_total', 'Job deduplication lookups by outcome.', ('result',))
+
+# 저장된 결과가 None일 수도 있으므로 조회 실패는 별도의 값으로 구분
+_MISS = object()
+
+class JobDeduplicator:
+    def __init__(self, db_path:str, ttl_sec:float=24 * 60 * 60, memory_items:int=1024, cleanup_every:int=1000):
+        """
+        작업 해시(item.hash)를 키로 완료된 결과를 저장해서, 같은 작업이 다시 들어오면 추론 없이 저장된 결과를 사용하도록 함.
+        최근 결과는 메모리 LRU에서, 나머지는 SQLite 테이블에서 조회하고, ttl_sec이 지난 결과는 무시/삭제.
+        같은 프로세스 안에서 같은 키의 작업이 실행 중이면 새로 실행하지 않고 그 실행이 끝나기를 기다림.
+
+        :param db_path: 결과를 저장할 SQLite 파일 경로. 여러 worker 프로세스가 공유할 수 있음.
+        :param ttl_sec: 결과를 재사용할 최대 시간(초).
+        :param memory_items: 메모리에 유지할 최근 결과 수.
+        :param cleanup_every: 이 횟수만큼 저장할 때마다 만료된 행을 삭제.
+        """
+        self.db_path = db_path
+        self.ttl_sec = ttl_sec
+        self.memory_items = memory_items
+        self.cleanup_every = max(1, cleanup_every)
+
+        self._memory = OrderedDict()
+        self._running = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._put_count = 0
+
+        self.hit_count = 0
+        self.joined_count = 0
+        self.miss_count = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._connect().execute('CREATE TABLE IF NOT EXISTS job_results (job_hash TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, job_hash:str, default=None):
+        """
+        TTL 안에 저장된 결과 반환. 없으면 default.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(job_hash)
+            if entry is not None:
+                if now - entry[1] <= self.ttl_sec:
+                    self._memory.move_to_end(job_hash)
+                    return entry[0]
+                del self._memory[job_hash]
+
+        row = self._connect().execute('SELECT result, created_at FROM job_results WHERE job_hash = ?', (job_hash,)).fetchone()
+        if row is None or now - row[1] > self.ttl_sec:
+            return default
+        result = json.loads(row[0])
+        self._remember(job_hash, result, row[1])
+        return result
+
+    def put(self, job_hash:str, result):
+        """
+        결과 저장. result는 JSON으로 변환할 수 있어야 함.
+        """
+        created_at = time.time()
+        self._connect().execute('INSERT OR REPLACE INTO job_results (job_hash, result, created_at) VALUES (?, ?, ?)',
+                                (job_hash, json.dumps(result, ensure_ascii=False, default=str), created_at))
+        self._remember(job_hash, result, created_at)
+
+        with self._lock:
+            self._put_count += 1
+            cleanup = self._put_count % self.cleanup_every == 0
+        if cleanup:
+            self._connect().execute('DELETE FROM job_results WHERE created_at < ?', (created_at - self.ttl_sec,))
+
+    def _remember(self, job_hash:str, result, created_at:float):
+        with self._lock:
+            self._memory[job_hash] = (result, created_at)
+            self._memory.move_to_end(job_hash)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def run(self, job_hash:str, fn:callable, *args):
+        """
+        저장된 결과가 있으면 반환하고, 같은 키가 실행 중이면 끝나기를 기다렸다가 그 결과를 반환하고, 둘 다 아니면 fn(*args)를 실행해서 저장.
+        먼저 실행한 쪽이 실패하면 기다리던 쪽이 직접 실행함.
+
+        :return: (result, status). status는 'cached', 'joined', 'computed' 중 하나.
+        """
+        joined = False
+        while True:
+            result = self.get(job_hash, _MISS)
+            if result is not _MISS:
+                status = 'joined' if joined else 'cached'
+                self._count(status)
+                return result, status
+
+            with self._lock:
+                running = self._running.get(job_hash)
+                if running is None:
+                    done = self._running[job_hash] = threading.Event()
+            if running is None:
+                break
+            running.wait()
+            joined = True
+
+        try:
+            result = fn(*args)
+            self.put(job_hash, result)
+        finally:
+            with self._lock:
+                del self._running[job_hash]
+            done.set()
+        self._count('computed')
+        return result, 'computed'
+
+    def _count(self, status:str):
+        with self._lock:
+            if status == 'cached':
+                self.hit_count += 1
+            elif status == 'joined':
+                self.joined_count += 1
+            else:
+                self.miss_count += 1
+        dedup_requests.inc(result=status)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_items": len(self._memory),
+                "running": len(self._running),
+                "hit_count": self.hit_count,
+                "joined_count": self.joined_count,
+                "miss_count": self.miss_count,
+            }
@@ -0,0 +1,314 @@
+import time, queue, threading
+
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils import metrics
+from cores.QueueScheduler import QueueScheduler, queue_label
+
+jobs_total = metrics.registry.counter('worker_jobs_total', 'Jobs handled by the worker pipeline by outcome.', ('status',))
+jobs_expired = metrics.registry.counter('worker_jobs_expired_total', 'Jobs dropped before inference because their deadline passed.', ('queue',))
+prefetch_depth = metrics.registry.gauge('worker_prefetch_depth', 'Received jobs waiting for an inference worker.')
+
+class JobPipeline:
+    def __init__(self, queue_client, queue_urls:list, handler:callable, completer:callable, on_error:callable=None, queue_weights:list=None,
+                 receive_batch_size:int=10, wait_sec:int=10, inference_workers:int=1, prefetch:int=10,
+                 completion_workers:int=4, delete_interval_sec:float=0.2, visibility_timeout:int=None, heartbeat=None,
+                 job_ttl_sec=None, deadline_fn:callable=None, on_expired:callable=None, logger=None):
+        """
+        큐 수신, 추론, 완료 전송/삭제를 각각 다른 스레드에서 실행해서 네트워크 대기와 추론 시간이 겹치도록 하는 worker 엔진.
+
+        :param queue_client: recevie_message, delete_message_batch를 제공하는 큐 클라이언트 (SQSClient).
+        :param queue_urls: 수신할 큐 URL 목록. 큐마다 별도 스레드에서 동시에 long-polling (QueueScheduler).
+        :param handler: handler(queue_url, message) -> result. 추론 worker 스레드에서 실행.
+        :param completer: completer(queue_url, message, result). 완료 전송 스레드에서 실행, 성공하면 메시지 삭제.
+                          Future를 반환하면 (CompletionClient.submit) 스레드를 점유하지 않고 Future가 끝난 뒤 삭제/실패 처리.
+        :param on_error: on_error(queue_url, message, error). None이면 로그만 남기고, 메시지는 visibility timeout이 지나면 큐에 다시 나타남.
+        :param queue_weights: 큐별 가중치. 받은 메시지를 이 비율로 번갈아 추론에 넘김. None이면 모두 같은 비율.
+        :param receive_batch_size: 한 번에 받을 최대 메시지 수 (SQS 최대 10).
+        :param inference_workers: 동시에 추론을 실행할 스레드 수.
+        :param prefetch: 추론을 기다리며 미리 받아 둘 수 있는 최대 메시지 수.
+        :param completion_workers: 완료 전송을 동시에 실행할 스레드 수.
+        :param delete_interval_sec: 삭제 요청을 모아서 보내는 최대 대기 시간.
+        :param visibility_timeout: 받은 메시지의 visibility timeout. None이면 큐 설정값 사용.
+        :param heartbeat: track/untrack을 제공하는 객체 (VisibilityHeartbeat). 받은 메시지를 처리가 끝날 때까지 연장.
+        :param job_ttl_sec: 큐에 들어온 뒤(SentTimestamp) 이 시간이 지난 작업은 추론하지 않음. 숫자 하나 또는 queue_urls 순서의 목록, 0/None이면 제한 없음.
+        :param deadline_fn: deadline_fn(message) -> epoch 초 또는 None. 작업이 직접 지정한 deadline으로, 있으면 job_ttl_sec보다 우선.
+        :param on_expired: on_expired(queue_url, message). 만료된 작업을 알리는 완료 전송 (Future 반환 가능). None이면 삭제만 함.
+        """
+        self.queue_client = queue_client
+        self.queue_urls = list(queue_urls)
+        self.scheduler = QueueScheduler(queue_client, self.queue_urls, weights=queue_weights, receive_batch_size=receive_batch_size,
+                                        wait_sec=wait_sec, visibility_timeout=visibility_timeout, heartbeat=heartbeat, logger=logger)
+        self.handler = handler
+        self.completer = completer
+        self.on_error = on_error or self._log_on_error
+        self.receive_batch_size = max(1, min(10, receive_batch_size))
+        self.wait_sec = wait_sec
+        self.inference_workers = max(1, inference_workers)
+        self.completion_workers = max(1, completion_workers)
+        self.delete_interval_sec = delete_interval_sec
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat = heartbeat
+        self.deadline_fn = deadline_fn
+        self.on_expired = on_expired
+        self.logger = logger
+
+        ttls = job_ttl_sec if isinstance(job_ttl_sec, (list, tuple)) else [job_ttl_sec] * len(self.queue_urls)
+        if len(ttls) == 1 and len(self.queue_urls) > 1:
+            ttls = ttls * len(self.queue_urls)
+        self._ttls = {queue_url: ttl for queue_url, ttl in zip(self.queue_urls, ttls) if ttl}
+
+        self._slots = threading.BoundedSemaphore(max(1, prefetch))
+        self._jobs = queue.Queue()
+        self._deletes = queue.Queue()
+        self._stop = threading.Event()
+        self._receiver_done = threading.Event()
+        self._threads = []
+        self._completion_pool = None
+
+        self.received_count = 0
+        self.completed_count = 0
+        self.failed_count = 0
+        self.expired_count = 0
+        self.deleted_count = 0
+        self._count_lock = threading.Lock()
+        self._outstanding = 0
+        self._outstanding_condition = threading.Condition()
+
+    def start(self):
+        self._stop.clear()
+        self._receiver_done.clear()
+        self._completion_pool = ThreadPoolExecutor(max_workers=self.completion_workers, thread_name_prefix='job-completion')
+        self.scheduler.start()
+        self._threads = [threading.Thread(target=self._receive_loop, name='job-receiver', daemon=True),
+                         threading.Thread(target=self._delete_loop, name='job-deleter', daemon=True)]
+        self._threads += [threading.Thread(target=self._inference_loop, name=f'job-inference-{index}', daemon=True)
+                          for index in range(self.inference_workers)]
+        for thread in self._threads:
+            thread.start()
+        if self.heartbeat is not None:
+            self.heartbeat.start()
+
+    def stop(self, timeout:float=None):
+        """
+        새 메시지 수신을 멈추고, 이미 받은 작업의 추론/완료/삭제가 끝날 때까지 대기.
+        """
+        self._stop.set()
+        receiver, deleter, *inference_threads = self._threads
+        self.scheduler.stop(timeout)
+        receiver.join(timeout)
+        for thread in inference_threads:
+            thread.join(timeout)
+        self._completion_pool.shutdown(wait=True)
+        # 전송 중인 완료 Future가 끝나고 삭제 요청을 넣을 때까지 대기
+        with self._outstanding_condition:
+            self._outstanding_condition.wait_for(lambda: self._outstanding == 0, timeout)
+        self._deletes.put(None)
+        deleter.join(timeout)
+        if self.heartbeat is not None:
+            self.heartbeat.stop()
+
+    def run(self):
+        """
+        파이프라인을 시작하고 KeyboardInterrupt까지 블로킹.
+        """
+        self.start()
+        try:
+            while not self._stop.is_set():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stats(self) -> dict:
+        return {
+            "received_count": self.received_count,
+            "completed_count": self.completed_count,
+            "failed_count": self.failed_count,
+            "expired_count": self.expired_count,
+            "deleted_count": self.deleted_count,
+            "prefetched": self._jobs.qsize(),
+            "queues": self.scheduler.stats(),
+        }
+
+    def _receive_loop(self):
+        while not self._stop.is_set():
+            # prefetch 버퍼에 빈 자리가 생길 때까지 기다린 뒤, 빈 자리만큼만 요청
+            if not self._slots.acquire(timeout=0.5):
+                continue
+            slots = 1
+            while slots < self.receive_batch_size and self._slots.acquire(blocking=False):
+                slots += 1
+
+            received = self.scheduler.next_batch(slots, timeout=0.5)
+            for _ in range(slots - len(received)):
+                self._slots.release()
+            for job in received:
+                self._add_count('received_count')
+                self._jobs.put(job)
+            prefetch_depth.set(self._jobs.qsize())
+        self._receiver_done.set()
+
+    def _inference_loop(self):
+        while True:
+            try:
+                queue_url, message = self._jobs.get(timeout=0.5)
+            except queue.Empty:
+                if self._receiver_done.is_set():
+                    return
+                continue
+            self._slots.release()
+            prefetch_depth.set(self._jobs.qsize())
+
+            # 호출 쪽이 이미 포기한 작업은 추론하지 않고 expired로 완료 처리
+            try:
+                expired = self._is_expired(queue_url, message)
+            except Exception as e:
+                # 만료 확인 중 오류가 나도 추론 스레드가 멈추지 않도록 실패로 처리
+                self._fail(queue_url, message, e)
+                continue
+            if expired:
+                jobs_expired.inc(queue=queue_label(queue_url))
+                send = partial(self.on_expired, queue_url, message) if self.on_expired is not None else self._no_completion
+                self._completion_pool.submit(self._complete, queue_url, message, send, 'expired')
+                continue
+
+            try:
+                with metrics.timer('worker.inference'):
+                    result = self.handler(queue_url, message)
+            except Exception as e:
+                self._fail(queue_url, message, e)
+                continue
+            self._completion_pool.submit(self._complete, queue_url, message, partial(self.completer, queue_url, message, result))
+
+    def _deadline(self, queue_url:str, message:dict) -> float:
+        # deadline을 읽을 수 없거나 숫자가 아닌 메시지는 deadline이 없는 것으로 보고, handler에서 오류로 처리되도록 그대로 둠
+        if self.deadline_fn is not None:
+            deadline = None
+            try:
+                deadline = self.deadline_fn(message)
+                if deadline is not None:
+                    return float(deadline)
+            except (TypeError, ValueError) as e:
+                self._log_error('deadline', f'Ignoring invalid deadline {deadline!r}: {e}')
+            except Exception as e:
+                self._log_error('deadline', f'Error while reading deadline: {e}')
+
+        ttl = self._ttls.get(queue_url)
+        sent_timestamp = message.get("Attributes", {}).get("SentTimestamp")
+        if ttl and sent_timestamp is not None:
+            try:
+                return int(sent_timestamp) / 1000 + ttl
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    def _is_expired(self, queue_url:str, message:dict) -> bool:
+        deadline = self._deadline(queue_url, message)
+        return deadline is not None and time.time() > deadline
+
+    @staticmethod
+    def _no_completion():
+        return None
+
+    def _complete(self, queue_url:str, message:dict, send:callable, status:str='completed'):
+        try:
+            with metrics.timer('worker.completion'):
+                outcome = send()
+        except Exception as e:
+            self._fail(queue_url, message, e)
+            return
+        if isinstance(outcome, Future):
+            with self._outstanding_condition:
+                self._outstanding += 1
+            outcome.add_done_callback(lambda future: self._complete_future(queue_url, message, future, status))
+            return
+        self._finish(queue_url, message, status)
+
+    def _complete_future(self, queue_url:str, message:dict, future:Future, status:str):
+        try:
+            error = RuntimeError('Completion was cancelled.') if future.cancelled() else future.exception()
+            if error is not None:
+                self._fail(queue_url, message, error)
+            else:
+                self._finish(queue_url, message, status)
+        finally:
+            with self._outstanding_condition:
+                self._outstanding -= 1
+                self._outstanding_condition.notify_all()
+
+    def _finish(self, queue_url:str, message:dict, status:str='completed'):
+        self._add_count(f'{status}_count')
+        jobs_total.inc(status=status)
+        self._untrack(queue_url, message)
+        self.delete(queue_url, message["ReceiptHandle"])
+
+    def _fail(self, queue_url:str, message:dict, error:Exception):
+        self._add_count('failed_count')
+        jobs_total.inc(status='failed')
+        # on_error가 visibility timeout을 바꾸는 경우 heartbeat가 덮어쓰지 않도록 먼저 추적을 해제
+        self._untrack(queue_url, message)
+        try:
+            self.on_error(queue_url, message, error)
+        except Exception as e:
+            self._log_error('on_error', f'Error while handling failed job: {e}')
+
+    def delete(self, queue_url:str, receipt_handle:str):
+        """
+        삭제 요청을 모아서 delete_message_batch로 전송하도록 예약.
+        """
+        self._deletes.put((queue_url, receipt_handle))
+
+    def _delete_loop(self):
+        pending = {}
+        deadline = None
+        finished = False
+        while not finished:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._deletes.get(timeout=timeout)
+                if item is None:
+                    finished = True
+                else:
+                    queue_url, receipt_handle = item
+                    pending.setdefault(queue_url, []).append(receipt_handle)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.delete_interval_sec
+            except queue.Empty:
+                pass
+
+            full = any(len(handles) >= 10 for handles in pending.values())
+            if finished or full or (deadline is not None and time.monotonic() >= deadline):
+                for queue_url, handles in pending.items():
+                    for start in range(0, len(handles), 10):
+                        self._delete_batch(queue_url, handles[start:start + 10])
+                pending = {}
+                deadline = None
+
+    def _delete_batch(self, queue_url:str, receipt_handles:list):
+        try:
+            failed = self.queue_client.delete_message_batch(queue_url, receipt_handles)
+            self._add_count('deleted_count', len(receipt_handles) - len(failed))
+            if failed:
+                self._log_error('delete', f'Failed to delete {len(failed)} messages: {failed}')
+        except Exception as e:
+            self._log_error('delete', f'Error while deleting messages: {e}')
+
+    def _log_on_error(self, queue_url:str, message:dict, error:Exception):
+        self._log_error('inference_task', f'Error while handling job from {queue_url}: {error}')
+
+    def _untrack(self, queue_url:str, message:dict):
+        if self.heartbeat is not None:
+            self.heartbeat.untrack(queue_url, message["ReceiptHandle"])
+
+    def _add_count(self, name:str, amount:int=1):
+        with self._count_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _log_error(self, method:str, message:str):
+        if self.logger is not None:
+            self.logger.add_error(method, message)
+        else:
+            print(f'[{method}]: {message}')
@@ -0,0 +1,239 @@
+import os, json, time, uuid, sqlite3, threading
+
+from contextlib import contextmanager
+
+from cores.QueueBackend import QueueBackend
+
+class InMemoryQueueBackend(QueueBackend):
+    def __init__(self, default_visibility_timeout:int=30):
+        """
+        SQS 없이 worker를 실행/테스트하기 위한 프로세스 내부 큐. SQSClient와 같은 메서드를 제공하고,
+        visibility timeout, ApproximateReceiveCount, 수신할 때마다 바뀌는 receipt handle을 SQS와 같은 방식으로 처리.
+        큐는 queue_url을 처음 사용할 때 자동으로 생성됨.
+        """
+        self.default_visibility_timeout = default_visibility_timeout
+        self._queues = {}
+        self._handles = {}
+        self._condition = threading.Condition()
+
+    def _queue(self, queue_url:str) -> list:
+        return self._queues.setdefault(queue_url, [])
+
+    def recevie_message(self, queue_url:str, max_message_num:int=1, wait_sec:int=10, visibility_timeout:int=None):
+        visibility_timeout = self.default_visibility_timeout if visibility_timeout is None else visibility_timeout
+        deadline = time.monotonic() + wait_sec
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                messages = []
+                for record in self._queue(queue_url):
+                    if record["visible_at"] > now:
+                        continue
+                    # SQS처럼 받을 때마다 새 receipt handle을 발급하므로 이전 handle로는 삭제/변경할 수 없음
+                    self._handles.pop(record["receipt_handle"], None)
+                    record["receipt_handle"] = uuid.uuid4().hex
+                    record["receive_count"] += 1
+                    record["visible_at"] = now + visibility_timeout
+                    self._handles[record["receipt_handle"]] = (queue_url, record)
+                    messages.append({
+                        "MessageId": record["message_id"],
+                        "ReceiptHandle": record["receipt_handle"],
+                        "Body": record["body"],
+                        "Attributes": {
+                            "ApproximateReceiveCount": str(record["receive_count"]),
+                            "SentTimestamp": str(record["sent_timestamp"]),
+                        },
+                    })
+                    if len(messages) >= max_message_num:
+                        break
+                if messages:
+                    return {"Messages": messages}
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    return {}
+                # 다음 메시지가 다시 보이게 되는 시점이나 새 메시지가 들어올 때까지 대기
+                next_visible = min((record["visible_at"] for record in self._queue(queue_url)), default=None)
+                if next_visible is not None:
+                    remaining = min(remaining, max(0.0, next_visible - now))
+                self._condition.wait(remaining)
+
+    def send_message(self, queue_url:str, message_body:dict):
+        with self._condition:
+            self._queue(queue_url).append({
+                "message_id": uuid.uuid4().hex,
+                "receipt_handle": None,
+                "body": message_body if isinstance(message_body, str) else json.dumps(message_body),
+                "receive_count": 0,
+                "sent_timestamp": int(time.time() * 1000),
+                "visible_at": 0.0,
+            })
+            self._condition.notify_all()
+
+    def delete_message(self, queue_url:str, receipt_handle):
+        with self._condition:
+            self._delete(queue_url, receipt_handle)
+
+    def delete_message_batch(self, queue_url:str, receipt_handles:list) -> list:
+        with self._condition:
+            return [receipt_handle for receipt_handle in receipt_handles if not self._delete(queue_url, receipt_handle)]
+
+    def change_message_visibility(self, queue_url:str, receipt_handle:str, timeout_sec:int):
+        with self._condition:
+            if not self._change_visibility(queue_url, receipt_handle, timeout_sec):
+                raise ValueError(f"Invalid receipt handle: {receipt_handle}")
+
+    def change_message_visibility_batch(self, queue_url:str, receipt_handles:list, timeout_sec:int) -> list:
+        with self._condition:
+            return [receipt_handle for receipt_handle in receipt_handles
+                    if not self._change_visibility(queue_url, receipt_handle, timeout_sec)]
+
+    def queue_size(self, queue_url:str) -> int:
+        with self._condition:
+            return len(self._queue(queue_url))
+
+    def _delete(self, queue_url:str, receipt_handle:str) -> bool:
+        entry = self._handles.get(receipt_handle)
+        if entry is None or entry[0] != queue_url:
+            return False
+        del self._handles[receipt_handle]
+        self._queue(queue_url).remove(entry[1])
+        return True
+
+    def _change_visibility(self, queue_url:str, receipt_handle:str, timeout_sec:int) -> bool:
+        entry = self._handles.get(receipt_handle)
+        if entry is None or entry[0] != queue_url:
+            return False
+        entry[1]["visible_at"] = time.monotonic() + timeout_sec
+        self._condition.notify_all()
+        return True
+
+class SQLiteQueueBackend(QueueBackend):
+    def __init__(self, db_path:str, default_visibility_timeout:int=30, poll_interval_sec:float=0.05):
+        """
+        SQLite 파일에 메시지를 저장하는 로컬 큐. 여러 프로세스(예: 부하 생성기와 worker)가 같은 파일을 큐로 공유할 수 있음.
+        동작은 InMemoryQueueBackend와 같고, long-polling은 poll_interval_sec 간격의 재조회로 처리.
+
+        :param db_path: 큐 DB 파일 경로. 없으면 생성.
+        """
+        self.db_path = db_path
+        self.default_visibility_timeout = default_visibility_timeout
+        self.poll_interval_sec = poll_interval_sec
+        self._local = threading.local()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue_url TEXT NOT NULL,
+                    message_id TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    receipt_handle TEXT UNIQUE,
+                    receive_count INTEGER NOT NULL DEFAULT 0,
+                    sent_timestamp INTEGER NOT NULL,
+                    visible_at REAL NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_visible ON messages (queue_url, visible_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # 스레드마다 연결을 하나씩 유지. WAL 모드라 다른 프로세스가 읽는 동안에도 쓸 수 있음
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def recevie_message(self, queue_url:str, max_message_num:int=1, wait_sec:int=10, visibility_timeout:int=None):
+        visibility_timeout = self.default_visibility_timeout if visibility_timeout is None else visibility_timeout
+        deadline = time.monotonic() + wait_sec
+        conn = self._connect()
+        while True:
+            now = time.time()
+            # 보이는 메시지가 없으면 쓰기 lock을 잡지 않고 다시 대기
+            if conn.execute('SELECT 1 FROM messages WHERE queue_url = ? AND visible_at <= ? LIMIT 1', (queue_url, now)).fetchone() is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return {}
+                time.sleep(min(self.poll_interval_sec, remaining))
+                continue
+            # 다른 worker가 같은 메시지를 가져가지 않도록 조회와 갱신을 하나의 쓰기 트랜잭션에서 처리
+            with self._transaction() as conn:
+                rows = conn.execute('SELECT id, message_id, body, receive_count, sent_timestamp FROM messages '
+                                    'WHERE queue_url = ? AND visible_at <= ? ORDER BY id LIMIT ?',
+                                    (queue_url, now, max_message_num)).fetchall()
+                messages = []
+                for row_id, message_id, body, receive_count, sent_timestamp in rows:
+                    receipt_handle = uuid.uuid4().hex
+                    conn.execute('UPDATE messages SET receipt_handle = ?, receive_count = ?, visible_at = ? WHERE id = ?',
+                                 (receipt_handle, receive_count + 1, now + visibility_timeout, row_id))
+                    messages.append({
+                        "MessageId": message_id,
+                        "ReceiptHandle": receipt_handle,
+                        "Body": body,
+                        "Attributes": {
+                            "ApproximateReceiveCount": str(receive_count + 1),
+                            "SentTimestamp": str(sent_timestamp),
+                        },
+                    })
+            if messages:
+                return {"Messages": messages}
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {}
+            time.sleep(min(self.poll_interval_sec, remaining))
+
+    def send_message(self, queue_url:str, message_body:dict):
+        self.send_message_batch(queue_url, [message_body])
+
+    def send_message_batch(self, queue_url:str, message_bodies:list):
+        sent_timestamp = int(time.time() * 1000)
+        rows = [(queue_url, uuid.uuid4().hex, body if isinstance(body, str) else json.dumps(body), sent_timestamp)
+                for body in message_bodies]
+        with self._transaction() as conn:
+            conn.executemany('INSERT INTO messages (queue_url, message_id, body, sent_timestamp) VALUES (?, ?, ?, ?)', rows)
+
+    def delete_message(self, queue_url:str, receipt_handle):
+        if self.delete_message_batch(queue_url, [receipt_handle]):
+            raise ValueError(f"Invalid receipt handle: {receipt_handle}")
+
+    def delete_message_batch(self, queue_url:str, receipt_handles:list) -> list:
+        return self._update_by_handle('DELETE FROM messages WHERE queue_url = ? AND receipt_handle = ?',
+                                      [(queue_url, receipt_handle) for receipt_handle in receipt_handles], receipt_handles)
+
+    def change_message_visibility(self, queue_url:str, receipt_handle:str, timeout_sec:int):
+        if self.change_message_visibility_batch(queue_url, [receipt_handle], timeout_sec):
+            raise ValueError(f"Invalid receipt handle: {receipt_handle}")
+
+    def change_message_visibility_batch(self, queue_url:str, receipt_handles:list, timeout_sec:int) -> list:
+        visible_at = time.time() + timeout_sec
+        return self._update_by_handle('UPDATE messages SET visible_at = ? WHERE queue_url = ? AND receipt_handle = ?',
+                                      [(visible_at, queue_url, receipt_handle) for receipt_handle in receipt_handles], receipt_handles)
+
+    def _update_by_handle(self, query:str, params:list, receipt_handles:list) -> list:
+        failed = []
+        with self._transaction() as conn:
+            for param, receipt_handle in zip(params, receipt_handles):
+                if conn.execute(query, param).rowcount == 0:
+                    failed.append(receipt_handle)
+        return failed
+
+    def queue_size(self, queue_url:str) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM messages WHERE queue_url = ?', (queue_url,)).fetchone()[0]
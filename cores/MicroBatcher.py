@@ -0,0 +1,143 @@
+import asyncio, time
+
+from collections import Counter
+
+from utils import metrics
+
+batch_size_histogram = metrics.registry.histogram('batch_size', 'Requests grouped into one batch call.', buckets=(1, 2, 4, 8, 16, 32, 64))
+batch_queue_wait = metrics.registry.histogram('batch_queue_wait_seconds', 'Time a request waits before its batch starts.')
+
+class MicroBatcher:
+    def __init__(self, batch_fn:callable, max_batch_size:int=8, max_wait_ms:float=10.0, executor=None):
+        """
+        동시에 들어온 요청을 모아 한 번의 배치 호출로 처리하는 마이크로 배칭 스케줄러.
+
+        :param batch_fn: 입력 리스트를 받아 같은 순서, 같은 길이의 결과 리스트를 반환하는 함수.
+        :param max_batch_size: 한 배치로 묶을 최대 요청 수. 1이면 배칭 없이 요청마다 바로 실행.
+        :param max_wait_ms: 첫 요청이 들어온 뒤 배치를 채우기 위해 기다리는 최대 시간(ms).
+        :param executor: batch_fn을 실행할 InferenceExecutor. None이면 이벤트 루프에서 직접 실행.
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_sec = max(0.0, max_wait_ms) / 1000
+        self.executor = executor
+        self.max_concurrent_batches = executor.pool_size if executor else 1
+
+        self._queue = None
+        self._slots = None
+        self._worker = None
+
+        self.request_count = 0
+        self.batch_count = 0
+        self.batch_size_count = Counter()
+        self.total_queue_wait_sec = 0.0
+        self.max_queue_wait_sec = 0.0
+
+    async def submit(self, input_data):
+        """
+        요청 하나를 배치 큐에 넣고, 해당 요청의 결과가 나올 때까지 대기.
+
+        :param input_data: batch_fn에 전달될 단일 입력.
+        :return: batch_fn 결과 중 해당 입력에 대응하는 값.
+        """
+        if self.max_batch_size == 1:
+            self._record_batch([time.perf_counter()])
+            return (await self._run_batch([input_data]))[0]
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((input_data, future, time.perf_counter()))
+        return await future
+
+    def stats(self) -> dict:
+        """
+        배치 크기 및 큐 대기 시간 통계 반환.
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_sec * 1000,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "request_count": self.request_count,
+            "batch_count": self.batch_count,
+            "avg_batch_size": self.request_count / self.batch_count if self.batch_count else 0.0,
+            "batch_size_count": dict(sorted(self.batch_size_count.items())),
+            "avg_queue_wait_ms": self.total_queue_wait_sec / self.request_count * 1000 if self.request_count else 0.0,
+            "max_queue_wait_ms": self.max_queue_wait_sec * 1000,
+        }
+
+    def _ensure_worker(self):
+        # 이벤트 루프 안에서 처음 호출될 때 큐와 배치 루프를 생성
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def _batch_loop(self):
+        while True:
+            # 실행 슬롯이 모두 사용 중이면 그동안 큐에 요청이 쌓여 다음 배치가 커짐
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = batch[0][2] + self.max_wait_sec
+
+            # 슬롯을 기다리는 동안 이미 쌓인 요청은 deadline과 관계없이 먼저 담음 (부하가 높을 때 배치가 1로 줄지 않도록)
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            task.add_done_callback(lambda _: self._slots.release())
+
+    async def _dispatch(self, batch:list):
+        inputs = [input_data for input_data, _, _ in batch]
+        self._record_batch([enqueued for _, _, enqueued in batch])
+
+        try:
+            results = await self._run_batch(inputs)
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # 배치 호출이 실패하면 요청 단위로 다시 실행해서 실패한 요청만 에러를 받도록 함
+            for input_data, future, _ in batch:
+                try:
+                    result = (await self._run_batch([input_data]))[0]
+                    if not future.done():
+                        future.set_result(result)
+                except Exception as item_e:
+                    if not future.done():
+                        future.set_exception(item_e)
+
+    async def _run_batch(self, inputs:list) -> list:
+        with metrics.timer('batch_inference'):
+            if self.executor is not None:
+                results = await self.executor.run(self.batch_fn, inputs)
+            else:
+                results = self.batch_fn(inputs)
+            results = list(results)
+        if len(results) != len(inputs):
+            raise ValueError(f"batch_fn returned {len(results)} results for {len(inputs)} inputs.")
+        return results
+
+    def _record_batch(self, enqueued_times:list):
+        now = time.perf_counter()
+        self.batch_count += 1
+        self.request_count += len(enqueued_times)
+        self.batch_size_count[len(enqueued_times)] += 1
+        batch_size_histogram.observe(len(enqueued_times))
+        for enqueued in enqueued_times:
+            wait_sec = now - enqueued
+            batch_queue_wait.observe(wait_sec)
+            self.total_queue_wait_sec += wait_sec
+            self.max_queue_wait_sec = max(self.max_queue_wait_sec, wait_sec)
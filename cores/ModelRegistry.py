@@ -0,0 +1,178 @@
+import os, gc, sys, time, threading
+
+from pathlib import Path
+from collections import OrderedDict
+
+from utils import metrics
+
+model_load_seconds = metrics.registry.histogram('model_load_seconds', 'Model checkpoint load time.', ('model',))
+model_evictions = metrics.registry.counter('model_evictions_total', 'Models evicted from memory.')
+
+class ModelRegistry:
+    def __init__(self, loader:callable, model_configs:dict, max_models:int=2, max_memory_gb:float=0, pinned:list=None, checkpoint_dir:Path=None):
+        """
+        모델을 처음 사용할 때 로드하고, 개수/메모리 한도를 넘으면 가장 오래 사용하지 않은 모델을 내리는 레지스트리.
+
+        :param loader: 모델 이름을 받아 로드된 모델 객체를 반환하는 함수.
+        :param model_configs: 사용 가능한 모델 설정 (li.stts_model_config_dict). 키가 모델 이름.
+        :param max_models: 동시에 메모리에 올려 둘 최대 모델 수. 0 이하면 제한 없음.
+        :param max_memory_gb: 메모리에 올려 둘 모델들의 최대 크기 합(GB). 0 이하면 제한 없음.
+        :param pinned: 축출하지 않고 항상 유지할 모델 이름 목록.
+        :param checkpoint_dir: 모델 크기를 파라미터로 계산할 수 없을 때 체크포인트 파일 크기를 읽을 경로.
+        """
+        self.loader = loader
+        self.model_configs = model_configs
+        self.max_models = max_models
+        self.max_memory_bytes = int(max_memory_gb * 1024 ** 3)
+        self.pinned = set(pinned or [])
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+
+        self._models = OrderedDict() # model_name -> (model, size_bytes), 마지막이 가장 최근 사용
+        self._lock = threading.Lock()
+        self._loading = {} # model_name -> threading.Event, 같은 모델을 동시에 두 번 로드하지 않도록 함
+
+        self.load_time_sec = {}
+        self.hit_count = 0
+        self.load_count = 0
+        self.evict_count = 0
+
+    def get(self, model_name:str):
+        """
+        모델 반환. 메모리에 없으면 로드하고, 한도를 넘으면 LRU 순서로 다른 모델을 축출.
+
+        :param model_name: model_configs에 등록된 모델 이름.
+        """
+        if model_name not in self.model_configs:
+            raise KeyError(f"Unknown model: {model_name}")
+
+        while True:
+            with self._lock:
+                if model_name in self._models:
+                    self._models.move_to_end(model_name)
+                    self.hit_count += 1
+                    return self._models[model_name][0]
+
+                event = self._loading.get(model_name)
+                if event is None:
+                    event = threading.Event()
+                    self._loading[model_name] = event
+                    break
+            # 다른 스레드가 로드 중이면 끝날 때까지 기다렸다가 다시 확인
+            event.wait()
+
+        try:
+            start = time.perf_counter()
+            model = self.loader(model_name)
+            load_time = time.perf_counter() - start
+            model_load_seconds.observe(load_time, model=model_name)
+            size = self._estimate_size(model, model_name)
+
+            with self._lock:
+                self._models[model_name] = (model, size)
+                self.load_time_sec[model_name] = load_time
+                self.load_count += 1
+                evicted = self._evict(keep=model_name)
+        finally:
+            with self._lock:
+                self._loading.pop(model_name, None)
+            event.set()
+
+        if evicted:
+            del evicted
+            self._release_memory()
+        return model
+
+    def unload(self, model_name:str) -> bool:
+        """
+        모델을 메모리에서 내림. pinned 모델도 명시적으로 요청하면 내림.
+        """
+        with self._lock:
+            entry = self._models.pop(model_name, None)
+        if entry is None:
+            return False
+        del entry
+        self._release_memory()
+        return True
+
+    def warmup(self, model_names:list, background:bool=True):
+        """
+        pinned 모델과 model_names를 미리 로드. background=True면 별도 스레드에서 로드하고 스레드를 반환.
+        """
+        names = list(dict.fromkeys([*self.pinned, *model_names]))
+
+        def _warmup():
+            for model_name in names:
+                try:
+                    self.get(model_name)
+                except Exception as e:
+                    print(f"모델 warm-up 실패: {model_name}, {e}")
+
+        if not background:
+            _warmup()
+            return None
+        thread = threading.Thread(target=_warmup, name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def loaded_models(self) -> list:
+        with self._lock:
+            return list(self._models.keys())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded_models": {name: size for name, (_, size) in self._models.items()},
+                "loaded_bytes": self._total_bytes(),
+                "max_models": self.max_models,
+                "max_memory_bytes": self.max_memory_bytes,
+                "pinned": sorted(self.pinned),
+                "loading": list(self._loading.keys()),
+                "hit_count": self.hit_count,
+                "load_count": self.load_count,
+                "evict_count": self.evict_count,
+                "load_time_sec": dict(self.load_time_sec),
+            }
+
+    def _evict(self, keep:str) -> list:
+        # lock을 잡은 상태에서 호출. 오래된 순서로 pinned와 keep을 제외하고 한도 안으로 들어올 때까지 축출
+        evicted = []
+        for model_name in list(self._models.keys()):
+            if not self._over_budget():
+                break
+            if model_name == keep or model_name in self.pinned:
+                continue
+            evicted.append(self._models.pop(model_name))
+            self.evict_count += 1
+            model_evictions.inc()
+        return evicted
+
+    def _over_budget(self) -> bool:
+        if self.max_models > 0 and len(self._models) > self.max_models:
+            return True
+        if self.max_memory_bytes > 0 and self._total_bytes() > self.max_memory_bytes:
+            return True
+        return False
+
+    def _total_bytes(self) -> int:
+        return sum(size for _, size in self._models.values())
+
+    def _estimate_size(self, model, model_name:str) -> int:
+        # torch 모듈이면 파라미터/버퍼 크기, 아니면 체크포인트 파일 크기로 추정
+        modules = [model] + [value for value in vars(model).values() if hasattr(value, 'parameters')] if hasattr(model, '__dict__') else [model]
+        size = 0
+        for module in modules:
+            if hasattr(module, 'parameters'):
+                size += sum(p.numel() * p.element_size() for p in module.parameters())
+                if hasattr(module, 'buffers'):
+                    size += sum(b.numel() * b.element_size() for b in module.buffers())
+        if size == 0 and self.checkpoint_dir is not None:
+            checkpoint_path = self.checkpoint_dir / model_name
+            if checkpoint_path.is_file():
+                size = os.path.getsize(checkpoint_path)
+        return size
+
+    def _release_memory(self):
+        gc.collect()
+        torch = sys.modules.get('torch')
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
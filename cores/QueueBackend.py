@@ -0,0 +1,157 @@
+import random, threading
+
+from abc import ABC, abstractmethod
+
+class QueueBackend(ABC):
+    """
+    worker가 사용하는 큐 연산 인터페이스. SQSClient(AWS SQS)와 로컬 구현(InMemoryQueueBackend, SQLiteQueueBackend)이 같은 메서드를 제공하므로
+    JobPipeline/QueueScheduler는 큐 종류와 무관하게 동작함.
+
+    하위 클래스는 recevie_message, send_message, delete_message, change_message_visibility를 구현하고,
+    배치 연산은 한 번의 요청으로 처리할 수 있으면 재정의.
+    """
+    @abstractmethod
+    def recevie_message(self, queue_url:str, max_message_num:int=1, wait_sec:int=10, visibility_timeout:int=None) -> dict:
+        """
+        :return: SQS receive_message 응답과 같은 형식. {"Messages": [{"MessageId", "ReceiptHandle", "Body", "Attributes"}, ...]}
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def send_message(self, queue_url:str, message_body:dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_message(self, queue_url:str, receipt_handle):
+        raise NotImplementedError
+
+    @abstractmethod
+    def change_message_visibility(self, queue_url:str, receipt_handle:str, timeout_sec:int):
+        raise NotImplementedError
+
+    def send_message_batch(self, queue_url:str, message_bodies:list):
+        for message_body in message_bodies:
+            self.send_message(queue_url, message_body)
+
+    def delete_message_batch(self, queue_url:str, receipt_handles:list) -> list:
+        """
+        :return: 삭제에 실패한 receipt handle 목록.
+        """
+        failed = []
+        for receipt_handle in receipt_handles:
+            try:
+                self.delete_message(queue_url, receipt_handle)
+            except Exception:
+                failed.append(receipt_handle)
+        return failed
+
+    def change_message_visibility_batch(self, queue_url:str, receipt_handles:list, timeout_sec:int) -> list:
+        """
+        :return: 변경에 실패한 receipt handle 목록.
+        """
+        failed = []
+        for receipt_handle in receipt_handles:
+            try:
+                self.change_message_visibility(queue_url, receipt_handle, timeout_sec)
+            except Exception:
+                failed.append(receipt_handle)
+        return failed
+
+    def retry_or_dead_letter(self, queue_url:str, message:dict, dead_letter_queue_url:str=None, max_receive_count:int=5,
+                             base_delay_sec:float=2, max_delay_sec:float=900) -> str:
+        """
+        처리에 실패한 메시지를 삭제하지 않고, 받은 횟수에 따라 지수 backoff 후 다시 보이도록 하거나 dead-letter 큐로 보냄.
+
+        :param dead_letter_queue_url: 최대 수신 횟수를 넘은 메시지를 보낼 큐.
+                                      None이면 메시지를 잃지 않도록 삭제하지 않고 max_delay_sec 뒤에 다시 보이도록 해서, 큐의 redrive policy에 맡김.
+        :param max_receive_count: 이 횟수만큼 받은 뒤에도 실패하면 dead-letter 처리.
+        :param base_delay_sec: 첫 재시도 대기 시간. 이후 실패할 때마다 2배 (jitter 포함).
+        :return: 'retry', 'dead_letter' 또는 'exhausted'(dead-letter 큐가 없어 남겨 둔 경우).
+        """
+        receive_count = int(message.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+        if receive_count >= max_receive_count:
+            if not dead_letter_queue_url:
+                self.change_message_visibility(queue_url, message["ReceiptHandle"], int(min(43200, max_delay_sec)))
+                return 'exhausted'
+            self.send_message(dead_letter_queue_url, message["Body"])
+            self.delete_message(queue_url, message["ReceiptHandle"])
+            return 'dead_letter'
+
+        self.change_message_visibility(queue_url, message["ReceiptHandle"], backoff_delay(receive_count, base_delay_sec, max_delay_sec))
+        return 'retry'
+
+def backoff_delay(attempt:int, base_delay_sec:float, max_delay_sec:float) -> int:
+    """
+    attempt번째 실패 후의 대기 시간(초). 같은 시점에 실패한 메시지가 한꺼번에 돌아오지 않도록 절반 범위의 jitter를 줌.
+    SQS visibility timeout 최대값(12시간)을 넘지 않음.
+    """
+    delay = min(max_delay_sec, base_delay_sec * (2 ** max(0, attempt - 1)))
+    return int(min(43200, random.uniform(delay / 2, delay)))
+
+class VisibilityHeartbeat:
+    def __init__(self, queue_client:QueueBackend, visibility_timeout:int=60, interval_sec:float=20, logger=None):
+        """
+        처리 중인 메시지의 visibility timeout을 주기적으로 연장해서, 추론이 길어져도 다른 worker가 같은 메시지를 받지 않도록 함.
+
+        :param visibility_timeout: 연장할 때마다 설정할 timeout(초).
+        :param interval_sec: 연장 주기. visibility_timeout보다 충분히 짧아야 함.
+        """
+        self.queue_client = queue_client
+        self.visibility_timeout = visibility_timeout
+        self.interval_sec = interval_sec
+        self.logger = logger
+        self._messages = {}
+        self._extending = set()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='sqs-heartbeat', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def track(self, queue_url:str, receipt_handle:str):
+        with self._lock:
+            self._messages.setdefault(queue_url, set()).add(receipt_handle)
+
+    def untrack(self, queue_url:str, receipt_handle:str):
+        # 이 메시지의 연장 요청이 진행 중이면 끝날 때까지 기다리므로, 반환 후에는 이 메시지의 timeout을 덮어쓰지 않음
+        with self._condition:
+            self._messages.get(queue_url, set()).discard(receipt_handle)
+            while (queue_url, receipt_handle) in self._extending:
+                self._condition.wait()
+
+    def tracked_count(self) -> int:
+        with self._lock:
+            return sum(len(handles) for handles in self._messages.values())
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_sec):
+            # 네트워크 요청 중에 lock을 잡고 있으면 track(스케줄러 condition 안에서 호출됨)이 기다리게 되므로,
+            # 목록만 복사하고 요청은 lock 밖에서 보냄
+            with self._lock:
+                snapshot = [(queue_url, list(handles)) for queue_url, handles in self._messages.items()]
+            for queue_url, handles in snapshot:
+                for start in range(0, len(handles), 10):
+                    with self._lock:
+                        tracked = self._messages.get(queue_url, set())
+                        batch = [handle for handle in handles[start:start + 10] if handle in tracked]
+                        self._extending.update((queue_url, handle) for handle in batch)
+                    if not batch:
+                        continue
+                    try:
+                        self.queue_client.change_message_visibility_batch(queue_url, batch, self.visibility_timeout)
+                    except Exception as e:
+                        if self.logger is not None:
+                            self.logger.add_error('heartbeat', f'Error while extending visibility timeout: {e}')
+                    finally:
+                        with self._condition:
+                            self._extending.difference_update((queue_url, handle) for handle in batch)
+                            self._condition.notify_all()
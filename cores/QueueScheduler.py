@@ -0,0 +1,195 @@
+import time, threading
+
+from collections import deque
+
+from utils import metrics
+
+WAIT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+queue_wait_seconds = metrics.registry.histogram('worker_queue_wait_seconds', 'Time from enqueue (SentTimestamp) to dispatch to inference.',
+                                                ('queue',), buckets=WAIT_BUCKETS)
+buffer_wait_seconds = metrics.registry.histogram('worker_buffer_wait_seconds', 'Time a received job waited in the local scheduler buffer.',
+                                                 ('queue',))
+queue_buffered = metrics.registry.gauge('worker_queue_buffered', 'Received jobs waiting in the scheduler buffer.', ('queue',))
+queue_dispatched = metrics.registry.counter('worker_queue_dispatched_total', 'Jobs dispatched by the scheduler.', ('queue',))
+
+def queue_label(queue_url:str) -> str:
+    # 메트릭 라벨에는 URL 전체 대신 큐 이름만 사용
+    return queue_url.rstrip('/').rsplit('/', 1)[-1] or queue_url
+
+class _QueueState:
+    def __init__(self, queue_url:str, weight:float):
+        self.queue_url = queue_url
+        self.label = queue_label(queue_url)
+        self.weight = weight
+        self.deficit = 0.0
+        self.buffer = deque()
+        self.received_count = 0
+        self.dispatched_count = 0
+        self.wait_sum = 0.0
+        self.wait_count = 0
+
+class QueueScheduler:
+    def __init__(self, queue_client, queue_urls:list, weights:list=None, receive_batch_size:int=10, wait_sec:int=10,
+                 visibility_timeout:int=None, buffer_size:int=None, heartbeat=None, logger=None):
+        """
+        여러 큐를 각각의 스레드에서 동시에 long-polling하고, 받은 메시지를 가중치 기반 deficit round-robin으로 내보내는 스케줄러.
+        한 큐의 long-polling이 다른 큐의 수신을 막지 않고, 우선순위 큐에 메시지가 계속 들어와도 다른 큐는 가중치 비율만큼 처리됨.
+
+        :param queue_urls: 스케줄링할 큐 URL 목록.
+        :param weights: 큐별 가중치. 한 라운드에서 큐마다 weight개씩 (소수면 누적해서) 내보냄. None이면 모두 1.
+        :param buffer_size: 큐마다 미리 받아 둘 최대 메시지 수. None이면 receive_batch_size.
+        :param heartbeat: track/untrack을 제공하는 객체. 버퍼에서 대기하는 동안에도 visibility timeout을 연장.
+        """
+        weights = list(weights) if weights else [1.0] * len(queue_urls)
+        if len(weights) != len(queue_urls):
+            raise ValueError(f"weights({len(weights)}) and queue_urls({len(queue_urls)}) must have the same length.")
+        if any(weight <= 0 for weight in weights):
+            raise ValueError("Queue weights must be positive.")
+
+        self.queue_client = queue_client
+        self.receive_batch_size = max(1, min(10, receive_batch_size))
+        self.wait_sec = wait_sec
+        self.visibility_timeout = visibility_timeout
+        self.buffer_size = max(1, buffer_size or self.receive_batch_size)
+        self.heartbeat = heartbeat
+        self.logger = logger
+
+        self._states = [_QueueState(queue_url, float(weight)) for queue_url, weight in zip(queue_urls, weights)]
+        self._cursor = 0
+        self._states[0].deficit = self._states[0].weight
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+
+        for state in self._states:
+            queue_buffered.set_function(lambda state=state: len(state.buffer), queue=state.label)
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._poll_loop, args=(state,), name=f'queue-poller-{state.label}', daemon=True)
+                         for state in self._states]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout:float=None):
+        """
+        수신을 멈추고, 버퍼에 남아 있는 메시지는 visibility timeout을 0으로 돌려서 바로 다른 worker가 받을 수 있도록 함.
+        """
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._release_buffered()
+
+    def next_batch(self, max_messages:int, timeout:float=None) -> list:
+        """
+        버퍼에 메시지가 생길 때까지 최대 timeout초 기다린 뒤, deficit round-robin 순서로 최대 max_messages개를 반환.
+
+        :return: (queue_url, message) 목록. timeout이 지나거나 stop되면 빈 목록.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._stop.is_set() and not any(state.buffer for state in self._states):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+            if self._stop.is_set():
+                return []
+            batch = self._take(max_messages)
+            # 버퍼에 빈 자리가 생겼으므로 대기 중인 poller를 깨움
+            self._condition.notify_all()
+
+            now, now_monotonic = time.time(), time.monotonic()
+            for state, message, received_at in batch:
+                buffer_wait_seconds.observe(now_monotonic - received_at, queue=state.label)
+                sent_timestamp = message.get("Attributes", {}).get("SentTimestamp")
+                if sent_timestamp is not None:
+                    wait = max(0.0, now - int(sent_timestamp) / 1000)
+                    state.wait_sum += wait
+                    state.wait_count += 1
+                    queue_wait_seconds.observe(wait, queue=state.label)
+                queue_dispatched.inc(queue=state.label)
+        return [(state.queue_url, message) for state, message, _ in batch]
+
+    def _take(self, max_messages:int) -> list:
+        # deficit round-robin: 큐 차례가 올 때마다 deficit에 weight를 더하고, deficit이 1 이상인 동안 메시지를 하나씩 꺼냄.
+        # 비어 있는 큐의 deficit은 0으로 초기화해서 쉬는 동안 몫이 쌓이지 않도록 함.
+        batch = []
+        while len(batch) < max_messages and any(state.buffer for state in self._states):
+            state = self._states[self._cursor]
+            if state.buffer and state.deficit >= 1:
+                message, received_at = state.buffer.popleft()
+                state.deficit -= 1
+                state.dispatched_count += 1
+                batch.append((state, message, received_at))
+                continue
+            if not state.buffer:
+                state.deficit = 0.0
+            self._cursor = (self._cursor + 1) % len(self._states)
+            next_state = self._states[self._cursor]
+            next_state.deficit += next_state.weight
+        return batch
+
+    def _poll_loop(self, state:_QueueState):
+        while not self._stop.is_set():
+            with self._condition:
+                while len(state.buffer) >= self.buffer_size and not self._stop.is_set():
+                    self._condition.wait()
+                space = self.buffer_size - len(state.buffer)
+            if self._stop.is_set():
+                break
+
+            try:
+                response = self.queue_client.recevie_message(state.queue_url, max_message_num=min(self.receive_batch_size, space),
+                                                             wait_sec=self.wait_sec, visibility_timeout=self.visibility_timeout)
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.add_error('queue_scheduler', f'Error while receiving from {state.label}: {e}')
+                self._stop.wait(1)
+                continue
+
+            messages = response.get("Messages", [])
+            if not messages:
+                continue
+            received_at = time.monotonic()
+            with self._condition:
+                for message in messages:
+                    if self.heartbeat is not None:
+                        self.heartbeat.track(state.queue_url, message["ReceiptHandle"])
+                    state.buffer.append((message, received_at))
+                state.received_count += len(messages)
+                self._condition.notify_all()
+
+    def _release_buffered(self):
+        with self._condition:
+            leftovers = [(state, [message for message, _ in state.buffer]) for state in self._states]
+            for state in self._states:
+                state.buffer.clear()
+
+        for state, messages in leftovers:
+            handles = [message["ReceiptHandle"] for message in messages]
+            for handle in handles:
+                if self.heartbeat is not None:
+                    self.heartbeat.untrack(state.queue_url, handle)
+            for start in range(0, len(handles), 10):
+                try:
+                    self.queue_client.change_message_visibility_batch(state.queue_url, handles[start:start + 10], 0)
+                except Exception as e:
+                    if self.logger is not None:
+                        self.logger.add_error('queue_scheduler', f'Error while releasing buffered messages: {e}')
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                state.label: {
+                    "weight": state.weight,
+                    "buffered": len(state.buffer),
+                    "received_count": state.received_count,
+                    "dispatched_count": state.dispatched_count,
+                    "mean_queue_wait_sec": state.wait_sum / state.wait_count if state.wait_count else 0.0,
+                }
+                for state in self._states
+            }
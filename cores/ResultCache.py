@@ -0,0 +1,144 @@
+import os, json, shutil, hashlib, threading
+
+from pathlib import Path
+from collections import OrderedDict
+
+from cores.DataBaseHandler import DBHandler
+from utils import metrics
+
+cache_requests = metrics.registry.counter('result_cache_requests_total', 'Result cache lookups by outcome.', ('result',))
+
+class ResultCache:
+    def __init__(self, cache_dir:Path, maximum_disk_size:int=1 * 1024 * 1024 * 1024, memory_items:int=1024, eviction_policy=None):
+        """
+        요청 내용의 해시를 키로 추론 결과를 저장하는 캐시.
+        결과는 cache_dir/files 아래 파일로 저장되고, 용량 관리는 DBHandler의 LRU 테이블을 사용.
+
+        :param cache_dir: 캐시 루트 경로 (예: ap.inner_output_path / 'result_cache').
+        :param maximum_disk_size: 캐시 파일 전체 크기 한도(byte). 초과하면 오래된 결과부터 삭제.
+        :param memory_items: 디스크 조회 없이 응답할 수 있도록 메모리에 유지할 최근 결과 수.
+        :param eviction_policy: DBHandler의 삭제 정책 ('lru', 'lfu', 'gdsf', 'ttl' 또는 EvictionPolicy 객체).
+        """
+        self.cache_dir = Path(cache_dir)
+        self.file_dir = self.cache_dir / 'files'
+        os.makedirs(self.file_dir, exist_ok=True)
+
+        self.db = DBHandler(db_path=str(self.cache_dir / 'result_cache.db'),
+                            file_root_path=str(self.file_dir),
+                            maximum_disk_size=maximum_disk_size,
+                            eviction_policy=eviction_policy)
+        self.db.init_db()
+
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hit_count = 0
+        self.miss_count = 0
+        self.bypass_count = 0
+
+    @staticmethod
+    def make_key(model_name:str, request_fields:dict) -> str:
+        """
+        모델 이름과 요청 필드로 캐시 키(sha256) 생성. 필드 순서와 무관하게 같은 키가 나옴.
+        """
+        payload = json.dumps({"model_name": model_name, "request": request_fields}, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key:str):
+        """
+        저장된 응답(dict) 반환. 없으면 None.
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+
+        # 메모리에 있어도 디스크 파일의 사용 기록은 갱신해야 자주 쓰는 결과가 먼저 삭제되지 않고,
+        # 디스크에서 삭제(evict)된 결과는 메모리에서도 응답하지 않아야 용량 한도와 삭제 정책이 그대로 적용됨
+        file_path = self.db.check_and_update_file(f'{key}.json')
+        if not file_path or not os.path.isfile(file_path):
+            if result is not None:
+                with self._lock:
+                    self._memory.pop(key, None)
+            self._record('miss')
+            return None
+
+        if result is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            self._remember(key, result)
+        self._record('hit')
+        return result
+
+    def put(self, key:str, result:dict):
+        """
+        응답(dict)을 캐시에 저장.
+        """
+        file_name = f'{key}.json'
+        tmp_path = self.file_dir / f'.{file_name}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, self.file_dir / file_name)
+        self.db.register_file(file_name)
+        self._remember(key, result)
+
+    def get_file(self, key:str, suffix:str):
+        """
+        저장된 결과 파일 경로 반환. 없으면 None.
+
+        :param suffix: 결과 파일 확장자 (예: '.wav').
+        """
+        file_path = self.db.check_and_update_file(f'{key}{suffix}')
+        if file_path and os.path.isfile(file_path):
+            self._record('hit')
+            return Path(file_path)
+        self._record('miss')
+        return None
+
+    def put_file(self, key:str, src_path:Path) -> Path:
+        """
+        추론 결과 파일을 캐시에 복사하고 캐시 내 경로를 반환.
+        """
+        file_name = f'{key}{Path(src_path).suffix}'
+        tmp_path = self.file_dir / f'.{file_name}.tmp'
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, self.file_dir / file_name)
+        self.db.register_file(file_name)
+        return self.file_dir / file_name
+
+    def record_bypass(self):
+        self._record('bypass')
+
+    def stats(self) -> dict:
+        with self._lock:
+            hit_count, miss_count, bypass_count = self.hit_count, self.miss_count, self.bypass_count
+            memory_items = len(self._memory)
+        lookups = hit_count + miss_count
+        return {
+            "hit_count": hit_count,
+            "miss_count": miss_count,
+            "bypass_count": bypass_count,
+            "hit_ratio": hit_count / lookups if lookups else 0.0,
+            "memory_items": memory_items,
+        }
+
+    def _record(self, result:str):
+        # get/get_file은 여러 스레드(asyncio.to_thread)에서 동시에 불리므로 카운터는 lock 안에서 갱신
+        with self._lock:
+            if result == 'hit':
+                self.hit_count += 1
+            elif result == 'miss':
+                self.miss_count += 1
+            else:
+                self.bypass_count += 1
+        cache_requests.inc(result=result)
+
+    def _remember(self, key:str, result:dict):
+        if self.memory_items <= 0:
+            return
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
@@ -0,0 +1,118 @@
+import os, glob, hashlib, threading
+
+from pathlib import Path
+
+from cores.DataBaseHandler import DBHandler
+from utils import metrics
+
+s3_cache_requests = metrics.registry.counter('s3_cache_requests_total', 'S3 read-through cache lookups by outcome.', ('result',))
+
+class S3Cache:
+    def __init__(self, s3_client, cache_dir:Path, maximum_disk_size:int=20 * 1024 * 1024 * 1024, eviction_policy=None):
+        """
+        S3 객체를 로컬 디스크에 보관하는 read-through 캐시. 같은 체크포인트/참조 음성을 컨테이너마다 다시 받지 않도록 함.
+        파일 이름은 bucket/key의 해시와 ETag로 만들어서, S3 객체가 바뀌면 (ETag 변경) 새 버전을 받음.
+        용량 관리는 DBHandler 테이블을 사용해서 maximum_disk_size를 넘으면 eviction_policy 순서로 (기본: 오래 쓰지 않은 파일부터) 삭제.
+
+        :param s3_client: head_object, download_file을 제공하는 S3Client.
+        :param cache_dir: 캐시 루트 경로. 파일은 cache_dir/files, 받는 중인 파일은 cache_dir/tmp에 저장.
+        :param eviction_policy: DBHandler의 삭제 정책 ('lru', 'lfu', 'gdsf', 'ttl' 또는 EvictionPolicy 객체).
+        """
+        self.s3_client = s3_client
+        self.cache_dir = Path(cache_dir)
+        self.file_dir = self.cache_dir / 'files'
+        self.tmp_dir = self.cache_dir / 'tmp'
+        os.makedirs(self.file_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self.db = DBHandler(db_path=str(self.cache_dir / 's3_cache.db'),
+                            file_root_path=str(self.file_dir),
+                            maximum_disk_size=maximum_disk_size,
+                            eviction_policy=eviction_policy)
+        self.db.init_db()
+
+        self._downloads = {}
+        self._lock = threading.Lock()
+
+    def _object_prefix(self, object_name:str) -> str:
+        return hashlib.sha256(f'{self.s3_client.bucket_name}/{object_name}'.encode('utf-8')).hexdigest()[:32]
+
+    def _file_name(self, object_name:str, etag:str) -> str:
+        # 확장자를 유지해서 파일 형식으로 로더를 고르는 코드가 그대로 동작하도록 함
+        return f'{self._object_prefix(object_name)}-{etag.replace("-", "_")}{Path(object_name).suffix}'
+
+    def _local_versions(self, object_name:str) -> list:
+        return glob.glob(str(self.file_dir / f'{self._object_prefix(object_name)}-*'))
+
+    def _latest_local_version(self, object_name:str):
+        # 여러 버전이 남아 있으면 (이전 버전 삭제 전 등) 가장 최근에 받은 파일을 사용
+        latest, latest_mtime = None, None
+        for path in self._local_versions(object_name):
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if latest_mtime is None or mtime > latest_mtime:
+                latest, latest_mtime = path, mtime
+        return latest
+
+    def get(self, object_name:str) -> Path:
+        """
+        객체의 로컬 파일 경로 반환. 캐시에 현재 ETag의 파일이 있으면 그대로 쓰고, 없으면 받아서 저장.
+        같은 객체를 여러 스레드가 동시에 요청하면 다운로드는 한 번만 실행됨.
+        S3에 연결할 수 없으면 캐시에 있는 이전 버전을 반환.
+
+        :raises FileNotFoundError: S3에 객체가 없는 경우.
+        """
+        try:
+            head = self.s3_client.head_object(object_name)
+        except Exception:
+            stale = self._latest_local_version(object_name)
+            if stale:
+                s3_cache_requests.inc(result='stale')
+                file_path = self.db.check_and_update_file(os.path.basename(stale))
+                return Path(file_path or stale)
+            raise
+        if head is None:
+            raise FileNotFoundError(f"S3 object not found: {object_name}")
+
+        file_name = self._file_name(object_name, head['etag'])
+        joined = False
+        while True:
+            file_path = self.db.check_and_update_file(file_name)
+            if file_path and os.path.isfile(file_path):
+                s3_cache_requests.inc(result='joined' if joined else 'hit')
+                return Path(file_path)
+
+            with self._lock:
+                done = self._downloads.get(file_name)
+                owner = done is None
+                if owner:
+                    done = self._downloads[file_name] = threading.Event()
+            if owner:
+                break
+            # 다른 스레드가 같은 객체를 받는 중이면 끝날 때까지 기다렸다가 다시 확인.
+            # 결과는 다시 확인한 뒤에 한 번만 셈 (먼저 받던 스레드가 실패하면 이 스레드가 받고 miss로 셈)
+            done.wait()
+            joined = True
+
+        try:
+            s3_cache_requests.inc(result='miss')
+            return self._download(object_name, file_name)
+        finally:
+            with self._lock:
+                del self._downloads[file_name]
+            done.set()
+
+    def _download(self, object_name:str, file_name:str) -> Path:
+        tmp_path = self.tmp_dir / file_name
+        if not self.s3_client.download_file(object_name, str(tmp_path)):
+            raise RuntimeError(f"Failed to download S3 object: {object_name}")
+        os.replace(tmp_path, self.file_dir / file_name)
+        self.db.register_file(file_name)
+
+        # 같은 객체의 이전 버전(ETag가 다른 파일)은 더 이상 쓰지 않으므로 삭제
+        for old_path in self._local_versions(object_name):
+            if os.path.basename(old_path) != file_name:
+                self.db.delete_file(os.path.basename(old_path))
+        return self.file_dir / file_name
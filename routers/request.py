@@ -1,4 +1,6 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class ItemRequest(BaseModel):
-    input_data: str
\ No newline at end of file
+    input_data: str
+    model_name: Optional[str] = None
\ No newline at end of file
@@ -1,50 +1,274 @@
-import os, io
+import os, time, asyncio, hashlib
 
-from fastapi import UploadFile, APIRouter, HTTPException, Body
+from concurrent.futures import ThreadPoolExecutor
+
+from functools import partial
+from contextlib import AsyncExitStack
+from fastapi import UploadFile, APIRouter, HTTPException, Body, Request, Response, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+from cores.MicroBatcher import MicroBatcher
+from cores.ModelRegistry import ModelRegistry
+from cores.ResultCache import ResultCache
+from cores.InferenceExecutor import InferenceExecutor, ExecutorBusyError
+from utils.environment import hp, ap, li, service_logger
+from utils.stream import file_stream_response, iterate_in_thread, wav_stream_header, to_pcm16_bytes, ReleasingStreamingResponse
+from utils import metrics
 
-core = coreClass(device=hp.device)
 router = APIRouter(prefix="/route")
 
+def load_core(model_name:str):
+    model_config = li.stts_model_config_dict[model_name]
+    return coreClass(checkpoint_path=ap.inner_checkpoint_path / model_name, config=model_config, device=hp.device)
+
+registry = ModelRegistry(loader=load_core,
+                         model_configs=li.stts_model_config_dict,
+                         max_models=hp.model_cache_max_num,
+                         max_memory_gb=hp.model_cache_max_gb,
+                         pinned=hp.model_pinned,
+                         checkpoint_dir=ap.inner_checkpoint_path)
+default_model_name = next(iter(li.stts_model_config_dict))
+
+def batch_method(model_name:str, input_data_list:list) -> list:
+    # 모델은 추론 풀에서 처음 사용할 때 로드됨
+    core = registry.get(model_name)
+    # core가 배치 추론을 지원하지 않으면 요청 단위로 실행
+    if hasattr(core, "batch_method"):
+        return core.batch_method(input_data_list)
+    return [core.method(input_data) for input_data in input_data_list]
+
+executor = InferenceExecutor(pool_type=hp.inference_pool_type,
+                             pool_size=hp.inference_pool_size,
+                             queue_size=hp.inference_queue_size,
+                             retry_after_sec=hp.inference_retry_after_sec)
+# 스트리밍 generator는 클라이언트 속도에 맞춰 청크 사이에서 오래 대기하므로, 추론 풀 스레드를 잡지 않도록 별도 풀에서 실행
+stream_pool = ThreadPoolExecutor(max_workers=hp.stream_pool_size, thread_name_prefix='audio-stream')
+batchers = {}
+result_cache = ResultCache(cache_dir=ap.inner_output_path / 'result_cache',
+                           maximum_disk_size=int(hp.result_cache_max_gb * 1024 ** 3),
+                           memory_items=hp.result_cache_memory_items) if hp.result_cache_enable else None
+
+metrics.registry.gauge('inference_in_flight', 'Admitted inference requests, running or queued.').set_function(lambda: executor.in_flight)
+metrics.registry.gauge('inference_queue_depth', 'Admitted inference requests waiting for a pool worker.').set_function(lambda: executor.queue_depth)
+metrics.registry.gauge('batch_queue_depth', 'Requests waiting to be grouped into a batch.').set_function(lambda: sum(batcher.stats()["queue_depth"] for batcher in list(batchers.values())))
+metrics.registry.gauge('models_loaded', 'Models resident in memory.').set_function(lambda: len(registry.loaded_models()))
+if result_cache is not None:
+    metrics.registry.gauge('result_cache_hit_ratio', 'Result cache hits / lookups since start.').set_function(lambda: result_cache.stats()["hit_ratio"])
+
+audio_time_to_first_chunk = metrics.registry.histogram('audio_time_to_first_chunk_seconds', 'Time from request to the first streamed audio chunk.', ('transport',))
+DEFAULT_SAMPLE_RATE = 24000
+STREAM_MAX_BUFFER = 8 # 클라이언트가 느릴 때 서버에 쌓아 둘 최대 청크 수
+
+def get_batcher(model_name:str) -> MicroBatcher:
+    # 서로 다른 모델의 요청은 같은 배치로 묶을 수 없으므로 모델마다 배처를 둠
+    if model_name not in batchers:
+        batchers[model_name] = MicroBatcher(batch_fn=partial(batch_method, model_name),
+                                            max_batch_size=hp.batch_max_size,
+                                            max_wait_ms=hp.batch_max_wait_ms,
+                                            executor=executor)
+    return batchers[model_name]
+
+async def make_cache_key(model_name:str, item:ItemRequest, file:UploadFile) -> str:
+    request_fields = item.model_dump(exclude={"model_name"})
+    if file is not None:
+        file_hash = hashlib.sha256()
+        while chunk := await file.read(1024 * 1024):
+            file_hash.update(chunk)
+        await file.seek(0)
+        request_fields["file"] = file_hash.hexdigest()
+    return ResultCache.make_key(model_name, request_fields)
+
 @router.post("/mainTag/method", tags=["mainTag"], response_model=ItemResponse)
-async def mainTag_method(file: UploadFile, item:ItemRequest):
+async def mainTag_method(file: UploadFile, item:ItemRequest, response:Response, x_cache_bypass:bool=Header(False)):
+    model_name = item.model_name or default_model_name
+    if model_name not in li.stts_model_config_dict:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+
+    # 같은 요청은 캐시된 결과로 응답. X-Cache-Bypass: true 헤더로 캐시 조회를 건너뜀
+    cache_key = None
+    if result_cache is not None:
+        cache_key = await make_cache_key(model_name, item, file)
+        if x_cache_bypass:
+            result_cache.record_bypass()
+            response.headers["X-Cache"] = "BYPASS"
+        else:
+            # 캐시 조회/저장은 SQLite와 디스크를 사용하므로 이벤트 루프 밖에서 실행
+            cached = await asyncio.to_thread(result_cache.get, cache_key)
+            response.headers["X-Cache"] = "HIT" if cached else "MISS"
+            if cached:
+                return ItemResponse(**cached)
+
     try:
-        x, runtime = method(item.input_data)
+        async with executor.admit():
+            x, runtime = await get_batcher(model_name).submit(item.input_data)
 
         response_json = {"checkout": True,
                          "return_data": x,
                          "runtime": runtime,
                          "message": "Complete"}
 
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after_sec)})
     except Exception as e:
         response_json = {"checkout": False,
                          "return_data": None,
                          "runtime": None,
                          "message": f"Error: {e}"}
 
-    response = ItemResponse(**response_json)
+    if cache_key is not None and response_json["checkout"]:
+        try:
+            await asyncio.to_thread(result_cache.put, cache_key, response_json)
+        except Exception as e:
+            service_logger.add_warning('mainTag_method', f'Failed to store result cache: {e}')
+
+    return ItemResponse(**response_json)
+
+
+def run_in_stream_pool(fn:callable, *args):
+    return asyncio.get_running_loop().run_in_executor(stream_pool, fn, *args)
+
+def run_in_thread(fn:callable, *args):
+    # 스트리밍 generator는 프로세스 사이로 넘길 수 없으므로 process 모드에서는 기본 스레드 풀 사용
+    if executor.pool_type == 'thread':
+        return executor.run(fn, *args)
+    return asyncio.to_thread(fn, *args)
 
-    return response
+async def prepare_stream_core(model_name:str):
+    if model_name not in li.stts_model_config_dict:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+    core = await run_in_thread(registry.get, model_name)
+    if not hasattr(core, "stream_method"):
+        raise HTTPException(status_code=501, detail=f"{model_name} does not support streaming.")
+    return core
 
+async def audio_chunk_stream(core, input_data:str, fmt:str, start:float, transport:str):
+    # core.stream_method가 오디오 청크를 만드는 대로 PCM(또는 WAV 프레임)으로 변환해서 전달
+    if fmt == "wav":
+        yield wav_stream_header(getattr(core, "sample_rate", DEFAULT_SAMPLE_RATE))
+    first = True
+    async for chunk in iterate_in_thread(core.stream_method, input_data, max_buffer=STREAM_MAX_BUFFER, run=run_in_stream_pool):
+        if first:
+            audio_time_to_first_chunk.observe(time.perf_counter() - start, transport=transport)
+            first = False
+        yield to_pcm16_bytes(chunk)
 
-@stts_router.post("/audio/streaming", tags=["stream"]) #, response_model=ResponseGenerateSingleTTS)
-async def generate_single_tts_play(file_name:str):
+@router.post("/audio/stream/generate", tags=["stream"])
+async def generate_audio_stream(item:ItemRequest, fmt:str="wav"):
+    start = time.perf_counter()
+    if fmt not in ("wav", "pcm"):
+        raise HTTPException(status_code=400, detail="fmt must be 'wav' or 'pcm'.")
+
+    # 수용 슬롯은 스트리밍이 끝날 때까지 유지하고, 응답이 끝나면 (iteration이 시작되지 않았더라도) 반환
+    stack = AsyncExitStack()
+    try:
+        await stack.enter_async_context(executor.admit())
+        core = await prepare_stream_core(item.model_name or default_model_name)
+    except ExecutorBusyError as e:
+        await stack.aclose()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after_sec)})
+    except BaseException:
+        await stack.aclose()
+        raise
+
+    sample_rate = getattr(core, "sample_rate", DEFAULT_SAMPLE_RATE)
+    media_type = "audio/wav" if fmt == "wav" else f"audio/L16; rate={sample_rate}; channels=1"
+    return ReleasingStreamingResponse(audio_chunk_stream(core, item.input_data, fmt, start, "http"), release=stack.aclose,
+                                      media_type=media_type, headers={"Cache-Control": "no-store"})
+
+@router.websocket("/audio/ws")
+async def generate_audio_ws(websocket:WebSocket):
+    """
+    첫 메시지로 {"input_data": ..., "model_name": ..., "fmt": "pcm" | "wav"}를 받고,
+    {"event": "start"} 이후 오디오 청크를 binary frame으로 보낸 뒤 {"event": "end"}로 종료.
+    """
+    await websocket.accept()
     try:
-        # WAV 파일을 스트리밍하여 재생 가능하도록 반환
-        with open(file_name, "rb") as f:
-            wav_data = f.read()
-        headers = {
-            'Content-Disposition': 'inline; filename="output.wav"'
-        }
-        return StreamingResponse(io.BytesIO(wav_data), media_type="audio/wav", headers=headers)
+        request = await websocket.receive_json()
+        start = time.perf_counter()
+        fmt = request.pop("fmt", "pcm")
+        item = ItemRequest(**request)
 
+        async with executor.admit():
+            core = await prepare_stream_core(item.model_name or default_model_name)
+            await websocket.send_json({"event": "start",
+                                       "format": fmt,
+                                       "sample_rate": getattr(core, "sample_rate", DEFAULT_SAMPLE_RATE),
+                                       "channels": 1,
+                                       "sample_width": 2})
+            # send_bytes는 전송 버퍼가 비워질 때까지 대기하므로 느린 클라이언트는 생산 쪽을 멈추게 함
+            async for chunk in audio_chunk_stream(core, item.input_data, fmt, start, "websocket"):
+                await websocket.send_bytes(chunk)
+            await websocket.send_json({"event": "end"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except ExecutorBusyError as e:
+        await websocket.close(code=1013, reason=str(e))
+    except HTTPException as e:
+        await websocket.send_json({"event": "error", "status_code": e.status_code, "message": e.detail})
+        await websocket.close(code=1011)
     except Exception as e:
-        stts_logger.add_error('generate_single_tts_play', e)
-        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+        service_logger.add_error('generate_audio_ws', e)
+        await websocket.send_json({"event": "error", "status_code": 500, "message": str(e)})
+        await websocket.close(code=1011)
+
+
+@router.get("/mainTag/batch/stats", tags=["mainTag"])
+async def mainTag_batch_stats():
+    return JSONResponse({"batchers": {model_name: batcher.stats() for model_name, batcher in batchers.items()},
+                         "executor": executor.stats()})
+
+
+@router.get("/cache/stats", tags=["cache"])
+async def get_cache_stats():
+    if result_cache is None:
+        return JSONResponse({"enable": False})
+    return JSONResponse({"enable": True, **result_cache.stats()})
+
+
+@router.get("/models", tags=["model"])
+async def get_models():
+    return JSONResponse({"available_models": list(li.stts_model_config_dict.keys()), **registry.stats()})
+
+@router.post("/models/{model_name}/load", tags=["model"])
+async def load_model(model_name:str):
+    if model_name not in li.stts_model_config_dict:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_name}")
+    # 로딩은 이 프로세스의 registry에 해야 하므로 executor(프로세스 모드에서는 자식 프로세스, 추론 슬롯 사용)를 거치지 않음
+    await asyncio.to_thread(registry.get, model_name)
+    return JSONResponse({"checkout": True, "message": f"{model_name} is loaded."})
+
+@router.post("/models/{model_name}/unload", tags=["model"])
+async def unload_model(model_name:str):
+    if not registry.unload(model_name):
+        raise HTTPException(status_code=404, detail=f"{model_name} is not loaded.")
+    return JSONResponse({"checkout": True, "message": f"{model_name} is unloaded."})
+
+
+def resolve_output_file(file_name:str):
+    """
+    file_name을 ap.inner_output_path 기준으로 해석해서, 실제 경로(심볼릭 링크 포함)가 그 안에 있는 파일일 때만 경로를 반환.
+    '../' 나 절대 경로로 출력 폴더 밖의 파일을 읽지 못하도록 함.
+    """
+    output_root = os.path.realpath(ap.inner_output_path)
+    file_path = os.path.realpath(os.path.join(output_root, file_name))
+    if os.path.commonpath([output_root, file_path]) != output_root or not os.path.isfile(file_path):
+        return None
+    return file_path
+
+@router.api_route("/audio/streaming", methods=["GET", "POST"], tags=["stream"]) #, response_model=ResponseGenerateSingleTTS)
+async def generate_single_tts_play(file_name:str, request:Request):
+    # WAV 파일을 청크 단위로 스트리밍하여 재생 가능하도록 반환 (Range 요청으로 탐색 가능)
+    file_path = resolve_output_file(file_name)
+    if file_path is None:
+        service_logger.add_error('generate_single_tts_play', 'File not found.')
+        raise HTTPException(status_code=404, detail="File not found.")
+    return file_stream_response(request, file_path, media_type="audio/wav", filename="output.wav", disposition="inline")
 
 @router.get("/download/file/{file_name}", tags=["download"])
-async def download_file(file_name:str):
-    file_path = ap.inner_output_path / file_name
-    if not file_path.exists():
-        stts_logger.add_error('generate_single_tts_file', 'File not found.')
+async def download_file(file_name:str, request:Request):
+    file_path = resolve_output_file(file_name)
+    if file_path is None:
+        service_logger.add_error('generate_single_tts_file', 'File not found.')
         raise HTTPException(status_code=404, detail="File not found.")
-    return FileResponse(file_path, media_type='audio/wav', filename=file_name)
\ No newline at end of file
+    return file_stream_response(request, file_path, media_type='audio/wav', filename=os.path.basename(file_path))
\ No newline at end of file
@@ -0,0 +1,58 @@
+import os, sqlite3
+
+from cores.DataBaseHandler import DBHandler
+
+def make_handler(tmp_path, **kwargs) -> DBHandler:
+    file_root = tmp_path / 'files'
+    (file_root / 'sub').mkdir(parents=True)
+    (file_root / 'a.wav').write_bytes(b'a' * 100)
+    (file_root / 'sub' / 'b.wav').write_bytes(b'b' * 100)
+    db = DBHandler(str(tmp_path / 'cache.db'), str(file_root), **kwargs)
+    db.init_db()
+    return db
+
+def hit_counts(tmp_path) -> dict:
+    conn = sqlite3.connect(str(tmp_path / 'cache.db'))
+    return dict(conn.execute("SELECT file_name, hit_count FROM reference_voice_files"))
+
+def test_nested_file_hits_are_recorded(tmp_path):
+    for memory_items in (100, 0):
+        root = tmp_path / str(memory_items)
+        db = make_handler(root, memory_items=memory_items)
+        for _ in range(3):
+            file_path = db.check_and_update_file('b.wav')
+            assert file_path == os.path.join(str(root / 'files'), 'sub', 'b.wav')
+            assert os.path.isfile(file_path)
+        db.flush()
+        assert hit_counts(root)['b.wav'] == 3
+
+def test_eviction_removes_nested_files(tmp_path):
+    db = make_handler(tmp_path, maximum_disk_size=150)
+    (tmp_path / 'files' / 'c.wav').write_bytes(b'c' * 100)
+    db.register_file('c.wav')
+    db.wait_for_unlinks()
+    assert not (tmp_path / 'files' / 'a.wav').exists()
+    assert not (tmp_path / 'files' / 'sub' / 'b.wav').exists()
+    assert set(hit_counts(tmp_path)) == {'c.wav'}
+    assert db.total_size() == 100
+
+def test_eviction_keeps_rows_it_could_not_remove(tmp_path, monkeypatch):
+    db = make_handler(tmp_path, maximum_disk_size=150)
+    blocked = str(tmp_path / 'files' / 'sub' / 'b.wav')
+    replace, remove = os.replace, os.remove
+    def fail_on_blocked(function):
+        def wrapper(src, *args, **kwargs):
+            if str(src) == blocked:
+                raise PermissionError(src)
+            return function(src, *args, **kwargs)
+        return wrapper
+    monkeypatch.setattr(os, 'replace', fail_on_blocked(replace))
+    monkeypatch.setattr(os, 'remove', fail_on_blocked(remove))
+
+    (tmp_path / 'files' / 'c.wav').write_bytes(b'c' * 100)
+    db.register_file('c.wav')
+    db.wait_for_unlinks()
+    assert not (tmp_path / 'files' / 'a.wav').exists()
+    assert os.path.isfile(blocked)
+    assert set(hit_counts(tmp_path)) == {'b.wav', 'c.wav'}
+    assert db.total_size() == 200
@@ -0,0 +1,14 @@
+from cores.JobDeduplicator import JobDeduplicator
+
+def test_none_result_is_reused(tmp_path):
+    calls = []
+    def task():
+        calls.append(1)
+        return None
+
+    dedup = JobDeduplicator(str(tmp_path / 'dedup.db'))
+    assert dedup.run('job', task) == (None, 'computed')
+    assert dedup.run('job', task) == (None, 'cached')
+    assert JobDeduplicator(str(tmp_path / 'dedup.db')).run('job', task) == (None, 'cached')
+    assert len(calls) == 1
+    assert dedup.get('other') is None
@@ -0,0 +1,60 @@
+import json, time, threading
+
+from cores.JobPipeline import JobPipeline
+from cores.LocalQueue import InMemoryQueueBackend
+
+QUEUE_URL = 'local/job_queue'
+
+def run_pipeline(bodies:list, deadline_fn:callable, timeout:float=5.0):
+    backend = InMemoryQueueBackend()
+    completed, expired, failed = [], [], []
+    done = threading.Event()
+
+    def mark():
+        if len(completed) + len(expired) + len(failed) >= len(bodies):
+            done.set()
+
+    def completer(queue_url:str, message:dict, result):
+        completed.append(json.loads(message["Body"]))
+        mark()
+
+    def on_expired(queue_url:str, message:dict):
+        expired.append(json.loads(message["Body"]))
+        mark()
+
+    def on_error(queue_url:str, message:dict, error:Exception):
+        backend.delete_message(queue_url, message["ReceiptHandle"])
+        failed.append(json.loads(message["Body"]))
+        mark()
+
+    pipeline = JobPipeline(queue_client=backend,
+                           queue_urls=[QUEUE_URL],
+                           handler=lambda queue_url, message: message["Body"],
+                           completer=completer,
+                           on_error=on_error,
+                           wait_sec=1,
+                           deadline_fn=deadline_fn,
+                           on_expired=on_expired)
+    for body in bodies:
+        backend.send_message(QUEUE_URL, json.dumps(body))
+    pipeline.start()
+    done.wait(timeout)
+    pipeline.stop()
+    return pipeline, completed, expired, failed
+
+def test_malformed_deadline_does_not_stop_inference():
+    # 숫자가 아닌 deadline은 deadline이 없는 것으로 처리하고, 다음 작업도 계속 처리해야 함
+    bodies = [{"id": 0, "deadline": "2026-10-18T00:00:00"}, {"id": 1}, {"id": 2, "deadline": time.time() - 60}]
+    pipeline, completed, expired, failed = run_pipeline(bodies, lambda message: json.loads(message["Body"]).get("deadline"))
+
+    assert sorted(body["id"] for body in completed) == [0, 1]
+    assert [body["id"] for body in expired] == [2]
+    assert failed == []
+    assert pipeline.stats()["completed_count"] == 2
+
+def test_deadline_fn_error_is_not_fatal():
+    def deadline_fn(message:dict):
+        raise KeyError("deadline")
+
+    pipeline, completed, expired, failed = run_pipeline([{"id": 0}, {"id": 1}], deadline_fn)
+    assert sorted(body["id"] for body in completed) == [0, 1]
@@ -0,0 +1,36 @@
+import time, asyncio
+
+from cores.MicroBatcher import MicroBatcher
+from cores.InferenceExecutor import InferenceExecutor
+
+def test_backlog_forms_full_batches():
+    # 실행 슬롯이 하나뿐이라 앞 배치가 끝날 때까지 요청이 쌓이면, 다음 배치는 쌓인 요청으로 가득 채워져야 함
+    batch_sizes = []
+
+    def batch_fn(inputs:list) -> list:
+        batch_sizes.append(len(inputs))
+        time.sleep(0.05)
+        return [value * 2 for value in inputs]
+
+    executor = InferenceExecutor(pool_type='thread', pool_size=1, queue_size=64)
+    batcher = MicroBatcher(batch_fn=batch_fn, max_batch_size=8, max_wait_ms=5, executor=executor)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit(value) for value in range(40)))
+
+    results = asyncio.run(main())
+    assert results == [value * 2 for value in range(40)]
+    assert batch_sizes == [8] * 5
+
+def test_single_request_waits_at_most_max_wait():
+    batcher = MicroBatcher(batch_fn=lambda inputs: list(inputs), max_batch_size=8, max_wait_ms=10)
+
+    async def main():
+        start = time.perf_counter()
+        result = await batcher.submit('a')
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(main())
+    assert result == 'a'
+    assert elapsed < 1.0
+    assert batcher.stats()["batch_size_count"] == {1: 1}
@@ -0,0 +1,30 @@
+import os, threading
+
+from cores.ResultCache import ResultCache
+
+def test_memory_hit_is_dropped_after_disk_eviction(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put('k', {"text": "hello"})
+    assert cache.get('k') == {"text": "hello"}
+
+    os.remove(cache.file_dir / 'k.json')
+    assert cache.get('k') is None
+    assert cache.stats()["memory_items"] == 0
+    assert (cache.hit_count, cache.miss_count) == (1, 1)
+
+def test_counters_are_exact_under_concurrent_lookups(tmp_path):
+    cache = ResultCache(tmp_path)
+    cache.put('k', {"text": "hello"})
+
+    def lookup():
+        for _ in range(200):
+            cache.get('k')
+            cache.get_file('missing', '.wav')
+            cache.record_bypass()
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hit_count, cache.miss_count, cache.bypass_count) == (1600, 1600, 1600)
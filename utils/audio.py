@@ -13,12 +13,17 @@ from tqdm import tqdm  # tqdm 라이브러리 임포트
 from scipy.signal import resample, butter, lfilter
 from demucs.separate import main as demucs_run
 
+from utils.metrics import timed
+
+@timed('audio.load_wav')
 def load_wav(input_path:str, sample_rate:int=None):
     return librosa.load(input_path, sr=sample_rate)
 
+@timed('audio.resample_wav')
 def resample_wav(wav:np.ndarray, orig_sr:int, new_sr:int):
     return librosa.resample(wav, orig_sr=orig_sr, target_sr=new_sr)
 
+@timed('audio.save_wav')
 def save_wav(wav:np.ndarray, output_path:str, sample_rate:int):
     sf.write(output_path, wav, sample_rate)
 
@@ -39,6 +44,7 @@ def print_duration(duration:int):
     minutes, seconds = divmod(remainder, 60)    
     print(f"Total duration: {hours} hours, {minutes} minutes, {seconds} seconds")
 
+@timed('audio.load_bytes_to_wav')
 def load_bytes_to_wav(audio_bytes:bytes, sample_rate:int):
     audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
     wav_bytes_io = io.BytesIO()
@@ -47,6 +53,7 @@ def load_bytes_to_wav(audio_bytes:bytes, sample_rate:int):
     wav, sr = librosa.load(wav_bytes_io, sr=sample_rate)
     return wav, sr
 
+@timed('audio.load_wav_to_bytes')
 def load_wav_to_bytes(wav:np.ndarray, sample_rate:int):
     wav_buffer = io.BytesIO()
     sf.write(wav_buffer, wav, sample_rate, format='WAV')
@@ -119,6 +126,7 @@ def pitch_smoothing_filter(audio: np.ndarray, sr: int) -> np.ndarray:
     smoothed_audio = librosa.effects.harmonic(audio)  # 고조파 성분 강조
     return smoothed_audio
 
+@timed('audio.control_speed')
 def control_audio_speed_ffmpeg(audio: np.ndarray, sr: int, speed_rate: float) -> np.ndarray:
     """
     FFmpeg의 atempo 필터를 사용하여 오디오의 재생 속도를 조절하고, 결과를 NumPy ndarray로 반환합니다.
@@ -189,6 +197,7 @@ def control_audio_speed_ffmpeg(audio: np.ndarray, sr: int, speed_rate: float) ->
         print('FFmpeg error:', e.stderr.decode())
         raise e
 
+@timed('audio.demucs_inference')
 def demucs_inference(input_audio_path:str, output_dir:str, model_name:str, sample_rate:int, stems:str='vocals'):
     input_audio_stem = os.path.basename(input_audio_path).split('.')[0]
     vocals_path = os.path.join(output_dir, model_name, input_audio_stem, f"{stems}.mp3")
@@ -206,6 +215,7 @@ def demucs_inference(input_audio_path:str, output_dir:str, model_name:str, sampl
 
     return y, sr
 
+@timed('audio.demucs_inference_file')
 def demucs_inference_file(input_audio_path:str, output_audio_path:str, output_dir:str, model_name:str, stems:str='vocals'):
     input_audio_stem = os.path.basename(input_audio_path).split('.')[0]
     vocals_path = os.path.join(output_dir, model_name, input_audio_stem, f"{stems}.mp3")
@@ -1,6 +1,7 @@
 import os, json
 
 from pathlib import Path
+from functools import lru_cache
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -13,6 +14,50 @@ class EnvSetting(BaseSettings):
 
     TTS_SERVER_HOST: str = '0.0.0.0'
     TTS_SERVER_PORT: int = 8080
+    SERVER_WORKERS: int = 1
+
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 10.0
+
+    INFERENCE_POOL_TYPE: str = 'thread'
+    INFERENCE_POOL_SIZE: int = 1
+    INFERENCE_QUEUE_SIZE: int = 16
+    INFERENCE_RETRY_AFTER_SEC: int = 1
+    STREAM_POOL_SIZE: int = 8
+
+    MODEL_CACHE_MAX_NUM: int = 2
+    MODEL_CACHE_MAX_GB: float = 0
+    MODEL_PINNED: str = '' # 콤마로 구분한 모델 이름
+    MODEL_WARMUP: str = '' # 콤마로 구분한 모델 이름
+
+    RESULT_CACHE_ENABLE: bool = True
+    RESULT_CACHE_MAX_GB: float = 1
+    RESULT_CACHE_MEMORY_ITEMS: int = 1024
+
+    WORKER_RECEIVE_BATCH_SIZE: int = 10
+    WORKER_INFERENCE_WORKERS: int = 1
+    WORKER_PREFETCH: int = 10
+    WORKER_COMPLETION_WORKERS: int = 4
+    WORKER_QUEUE_WEIGHTS: str = '4,1' # 콤마로 구분한 큐별 가중치 (우선순위 큐, 일반 큐 순서)
+    WORKER_COMPLETION_TIMEOUT_SEC: float = 10.0
+    WORKER_COMPLETION_MAX_RETRIES: int = 3
+    WORKER_COMPLETION_BATCH_SIZE: int = 1
+    WORKER_COMPLETION_BATCH_WAIT_MS: float = 50.0
+    WORKER_JOB_TTL_SEC: str = '0' # 콤마로 구분한 큐별 작업 유효 시간(초), 하나면 모든 큐에 적용. 0이면 제한 없음
+    WORKER_DEDUP_ENABLE: bool = True
+    WORKER_DEDUP_TTL_SEC: float = 86400.0
+    WORKER_DEDUP_MEMORY_ITEMS: int = 1024
+    WORKER_VISIBILITY_TIMEOUT: int = 60
+    WORKER_HEARTBEAT_SEC: float = 20.0
+    WORKER_MAX_RECEIVE_COUNT: int = 5
+    WORKER_RETRY_BASE_SEC: float = 2.0
+    WORKER_RETRY_MAX_SEC: float = 900.0
+
+    LOG_QUEUE: bool = True
+    LOG_ROTATION: str = 'size' # none, size, time
+    LOG_MAX_MB: int = 100
+    LOG_BACKUP_COUNT: int = 5
+    LOG_JSON: bool = False
 
     INNER_RESOURCES_PATH: str = './resources'
     OUTER_RESOURCES_PATH: str = './resources'
@@ -20,8 +65,6 @@ class EnvSetting(BaseSettings):
     if os.getenv("RUNENV"):
         model_config = SettingsConfigDict(env_file=os.path.join('envs', f'.env.{os.getenv("RUNENV")}'))
 
-envs = EnvSetting()
-
 class AbsolutePath(BaseModel):
     inner_checkpoint_path: Path
     outer_checkpoint_path: Path
@@ -44,28 +87,50 @@ class AbsolutePath(BaseModel):
             outer_output_path=outer_base_path / "outputs",
             inner_log_path=inner_base_path / "logs",
         )
-    
-if envs:
-    ap = AbsolutePath.with_base_path(inner_base_path=envs.INNER_RESOURCES_PATH, outer_base_path=envs.OUTER_RESOURCES_PATH)
-else:
-    ap = AbsolutePath.with_base_path(inner_base_path='./resources', outer_base_path='./resources')
 
 class HyperParams(BaseModel):
     server_host: str = "0.0.0.0"
     server_port: int = 8000
+    server_workers: int = 1 # 2 이상이면 모델을 부모에서 로드한 뒤 worker를 fork
     device: str = "cuda"
     bot_token: str = "telegram-bot-token"
     chat_id: str = "telegram-chat-id"  # 메시지를 보낼 대상의 채팅 ID
+    batch_max_size: int = 8 # 1이면 배칭 없이 요청마다 추론
+    batch_max_wait_ms: float = 10.0
+    inference_pool_type: str = "thread" # thread 또는 process
+    inference_pool_size: int = 1
+    inference_queue_size: int = 16 # 실행 중인 요청 외 대기 가능한 요청 수, 초과 시 429 반환
+    inference_retry_after_sec: int = 1
+    stream_pool_size: int = 8 # 스트리밍 generator 전용 스레드 수 (추론 풀과 분리)
+    model_cache_max_num: int = 2 # 0이면 제한 없음
+    model_cache_max_gb: float = 0 # 0이면 제한 없음
+    model_pinned: list = []
+    model_warmup: list = []
+    result_cache_enable: bool = True
+    result_cache_max_gb: float = 1
+    result_cache_memory_items: int = 1024
+    worker_receive_batch_size: int = 10 # SQS 최대 10
+    worker_inference_workers: int = 1
+    worker_prefetch: int = 10 # 추론 대기 중으로 미리 받아 둘 최대 메시지 수
+    worker_completion_workers: int = 4
+    worker_queue_weights: list = [4.0, 1.0]
+    worker_completion_timeout_sec: float = 10.0
+    worker_completion_max_retries: int = 3
+    worker_completion_batch_size: int = 1 # 1보다 크면 완료 결과를 JSON 배열로 묶어서 POST
+    worker_completion_batch_wait_ms: float = 50.0
+    worker_job_ttl_sec: list = [0.0] # SentTimestamp 기준으로 이 시간이 지난 작업은 추론하지 않고 expired로 완료
+    worker_dedup_enable: bool = True # 같은 hash의 작업은 저장된 결과를 재사용
+    worker_dedup_ttl_sec: float = 86400.0
+    worker_dedup_memory_items: int = 1024
+    worker_visibility_timeout: int = 60 # 처리 중인 메시지는 heartbeat로 이 시간만큼씩 계속 연장
+    worker_heartbeat_sec: float = 20.0
+    worker_max_receive_count: int = 5 # 이 횟수만큼 받고도 실패하면 dead-letter 큐로 이동
+    worker_retry_base_sec: float = 2.0
+    worker_retry_max_sec: float = 900.0
     
     class Config:
         arbitrary_types_allowed = True  # Allow arbitrary types
 
-if envs:
-    hp = HyperParams(server_host=envs.TTS_SERVER_HOST,
-                     server_port=envs.TTS_SERVER_PORT)
-else:
-    hp = HyperParams()
-
 class LabelInfo(BaseModel):
     language_code:dict = {"en": "en-us", "ko": "ko", "es": "es", "jp": "ja", "ch": "cmn"}
     a133_style_dict:dict = {'독백체': 'Mono', '대화체': 'Conv', '구연체': 'Oral', '중계체': 'Relay', '친절체': 'Kind', '애니체': 'Anime', '낭독체': 'Read'} # Oral: 구연체
@@ -84,11 +149,91 @@ class LabelInfo(BaseModel):
         }
     }
 
-avaliable_model_list_file_path = ap.inner_checkpoint_path / 'available_model_list.json'
-with open(str(avaliable_model_list_file_path), 'r') as f:
-    model_configs = json.load(f)
-li = LabelInfo(stts_model_config_dict=model_configs)
+# 설정, 모델 목록, 로거는 처음 사용할 때 만들고 재사용.
+# import만으로 파일을 읽거나 로그 파일을 건드리지 않으므로 worker 프로세스 spawn이 가벼워짐.
+@lru_cache(maxsize=None)
+def get_envs() -> EnvSetting:
+    return EnvSetting()
+
+@lru_cache(maxsize=None)
+def get_ap() -> AbsolutePath:
+    envs = get_envs()
+    return AbsolutePath.with_base_path(inner_base_path=envs.INNER_RESOURCES_PATH, outer_base_path=envs.OUTER_RESOURCES_PATH)
+
+@lru_cache(maxsize=None)
+def get_hp() -> HyperParams:
+    envs = get_envs()
+    return HyperParams(server_host=envs.TTS_SERVER_HOST,
+                       server_port=envs.TTS_SERVER_PORT,
+                       server_workers=envs.SERVER_WORKERS,
+                       batch_max_size=envs.BATCH_MAX_SIZE,
+                       batch_max_wait_ms=envs.BATCH_MAX_WAIT_MS,
+                       inference_pool_type=envs.INFERENCE_POOL_TYPE,
+                       inference_pool_size=envs.INFERENCE_POOL_SIZE,
+                       inference_queue_size=envs.INFERENCE_QUEUE_SIZE,
+                       inference_retry_after_sec=envs.INFERENCE_RETRY_AFTER_SEC,
+                       stream_pool_size=envs.STREAM_POOL_SIZE,
+                       model_cache_max_num=envs.MODEL_CACHE_MAX_NUM,
+                       model_cache_max_gb=envs.MODEL_CACHE_MAX_GB,
+                       model_pinned=[name.strip() for name in envs.MODEL_PINNED.split(',') if name.strip()],
+                       model_warmup=[name.strip() for name in envs.MODEL_WARMUP.split(',') if name.strip()],
+                       result_cache_enable=envs.RESULT_CACHE_ENABLE,
+                       result_cache_max_gb=envs.RESULT_CACHE_MAX_GB,
+                       result_cache_memory_items=envs.RESULT_CACHE_MEMORY_ITEMS,
+                       worker_receive_batch_size=envs.WORKER_RECEIVE_BATCH_SIZE,
+                       worker_inference_workers=envs.WORKER_INFERENCE_WORKERS,
+                       worker_prefetch=envs.WORKER_PREFETCH,
+                       worker_completion_workers=envs.WORKER_COMPLETION_WORKERS,
+                       worker_queue_weights=[float(weight) for weight in envs.WORKER_QUEUE_WEIGHTS.split(',') if weight.strip()],
+                       worker_completion_timeout_sec=envs.WORKER_COMPLETION_TIMEOUT_SEC,
+                       worker_completion_max_retries=envs.WORKER_COMPLETION_MAX_RETRIES,
+                       worker_completion_batch_size=envs.WORKER_COMPLETION_BATCH_SIZE,
+                       worker_completion_batch_wait_ms=envs.WORKER_COMPLETION_BATCH_WAIT_MS,
+                       worker_job_ttl_sec=[float(ttl) for ttl in envs.WORKER_JOB_TTL_SEC.split(',') if ttl.strip()],
+                       worker_dedup_enable=envs.WORKER_DEDUP_ENABLE,
+                       worker_dedup_ttl_sec=envs.WORKER_DEDUP_TTL_SEC,
+                       worker_dedup_memory_items=envs.WORKER_DEDUP_MEMORY_ITEMS,
+                       worker_visibility_timeout=envs.WORKER_VISIBILITY_TIMEOUT,
+                       worker_heartbeat_sec=envs.WORKER_HEARTBEAT_SEC,
+                       worker_max_receive_count=envs.WORKER_MAX_RECEIVE_COUNT,
+                       worker_retry_base_sec=envs.WORKER_RETRY_BASE_SEC,
+                       worker_retry_max_sec=envs.WORKER_RETRY_MAX_SEC)
+
+def get_available_model_list_file_path() -> Path:
+    return get_ap().inner_checkpoint_path / 'available_model_list.json'
+
+@lru_cache(maxsize=None)
+def get_li() -> LabelInfo:
+    with open(str(get_available_model_list_file_path()), 'r') as f:
+        model_configs = json.load(f)
+    return LabelInfo(stts_model_config_dict=model_configs)
+
+@lru_cache(maxsize=None)
+def get_service_logger() -> loggerConfig:
+    envs = get_envs()
+    return loggerConfig(logger_name=f'stts_inference_{envs.ENV_STATE}_{envs.ENV_INDEX}',
+                         log_dir=get_ap().inner_log_path,
+                         log_type='file',
+                         use_queue=envs.LOG_QUEUE,
+                         rotation=None if envs.LOG_ROTATION == 'none' else envs.LOG_ROTATION,
+                         max_bytes=envs.LOG_MAX_MB * 1024 * 1024,
+                         backup_count=envs.LOG_BACKUP_COUNT,
+                         json_format=envs.LOG_JSON)
+
+_lazy_attributes = {
+    'envs': get_envs,
+    'ap': get_ap,
+    'hp': get_hp,
+    'li': get_li,
+    'model_configs': lambda: get_li().stts_model_config_dict,
+    'avaliable_model_list_file_path': get_available_model_list_file_path,
+    'service_logger': get_service_logger,
+}
 
-service_logger = loggerConfig(logger_name=f'stts_inference_{envs.ENV_STATE}_{envs.ENV_INDEX}',
-                              log_dir=ap.inner_log_path,
-                              log_type='file')
\ No newline at end of file
+def __getattr__(name:str):
+    # 기존 코드의 `from utils.environment import hp, ap` 형태를 그대로 지원
+    if name in _lazy_attributes:
+        value = _lazy_attributes[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
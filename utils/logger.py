@@ -1,36 +1,138 @@
-import logging, os
+import logging, os, json, queue, atexit
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record:logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "method": getattr(record, 'method', None),
+            "message": getattr(record, 'body', record.getMessage()),
+        }
+        payload.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+class _DirectQueueHandler(QueueHandler):
+    # 같은 프로세스 안의 큐이므로 호출 스레드에서 포맷하지 않고 레코드를 그대로 넘김 (포맷은 listener 스레드에서)
+    def prepare(self, record:logging.LogRecord) -> logging.LogRecord:
+        return record
 
 class loggerConfig:
-    def __init__(self, logger_name:str, log_dir:str, log_type='file') -> None:
+    def __init__(self, logger_name:str, log_dir:str, log_type='file', use_queue:bool=False, rotation:str=None,
+                 max_bytes:int=100 * 1024 * 1024, backup_count:int=5, when:str='midnight', json_format:bool=False, reset:bool=False) -> None:
+        """
+        :param use_queue: True면 파일/스트림 쓰기를 백그라운드 스레드(QueueListener)에서 처리해서 로그 호출이 디스크를 기다리지 않음.
+        :param rotation: None(회전 없음), 'size'(max_bytes 초과 시), 'time'(when 주기마다).
+        :param json_format: True면 한 줄에 하나의 JSON 레코드로 기록. add_info 등에 넘긴 필드(request_id, duration_ms 등)가 포함됨.
+        :param reset: True면 시작할 때 기존 로그 파일을 삭제.
+        """
         os.makedirs(log_dir, exist_ok=True)
-        formatter = logging.Formatter('[%(asctime)s][%(levelname)s]: %(message)s')
+        if json_format:
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter('[%(asctime)s][%(levelname)s]: %(message)s')
         logging.getLogger(logger_name).handlers.clear()
         self.logger = logging.getLogger(logger_name)
         self.logger.setLevel(logging.INFO)
+        self.listener = None
+        self._paused = False
 
+        handlers = []
         if log_type == 'file' or log_type == 'both':
-            os.remove(os.path.join(log_dir, f'{logger_name}.log')) if os.path.isfile(os.path.join(log_dir, f'{logger_name}.log')) else None
-            file_handler = logging.FileHandler(os.path.join(log_dir, f'{logger_name}.log'))
+            log_path = os.path.join(log_dir, f'{logger_name}.log')
+            if reset and os.path.isfile(log_path):
+                os.remove(log_path)
+            if rotation == 'size':
+                file_handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            elif rotation == 'time':
+                file_handler = TimedRotatingFileHandler(log_path, when=when, backupCount=backup_count, encoding='utf-8')
+            else:
+                file_handler = logging.FileHandler(log_path, encoding='utf-8')
             file_handler.setFormatter(formatter)
-            self.logger.addHandler(file_handler)
+            handlers.append(file_handler)
         if log_type == 'stream' or log_type == 'both':
             stream_handler = logging.StreamHandler()
             stream_handler.setFormatter(formatter)
-            self.logger.addHandler(stream_handler)
+            handlers.append(stream_handler)
+
+        self.use_queue = use_queue
+        if use_queue:
+            self.handlers = handlers
+            self.queue_handler = _DirectQueueHandler(queue.SimpleQueue())
+            self.logger.addHandler(self.queue_handler)
+            self._start_listener()
+            atexit.register(self.stop)
+            # fork 중에 listener가 파일을 쓰고 있으면 자식에서 파일 lock이 잠긴 채 남으므로,
+            # fork 전에 큐를 비우고 멈췄다가 부모/자식에서 각각 다시 시작
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(before=self._pause_listener,
+                                    after_in_parent=self._resume_listener,
+                                    after_in_child=self._resume_listener_in_child)
+        else:
+            for handler in handlers:
+                self.logger.addHandler(handler)
 
         self.logger.info(f'Logger: {logger_name} is set by {log_type}.')
 
-    def add_info(self, method:str, message:str):
-        self.logger.info(f'[{method}]: {message}')
+    def start(self):
+        """
+        use_queue일 때 listener 스레드가 멈춰 있으면 다시 시작. 이미 실행 중이면 아무것도 하지 않음.
+        """
+        if self.use_queue and self.listener is None and not self._paused:
+            self._start_listener()
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue_handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def _pause_listener(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self._paused = True
+
+    def _resume_listener(self):
+        if self._paused:
+            self._paused = False
+            self._start_listener()
+
+    def _resume_listener_in_child(self):
+        if self._paused:
+            self.queue_handler.queue = queue.SimpleQueue()
+        self._resume_listener()
+
+    def stop(self):
+        """
+        큐에 남은 레코드를 모두 기록하고 listener 스레드를 종료.
+        """
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def _log(self, level:int, method:str, message:str, fields:dict, exc_info:bool=False):
+        if not self.logger.isEnabledFor(level):
+            return
+        message = str(message)
+        text = f'[{method}]: {message}'
+        if fields:
+            text += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        self.logger.log(level, text, exc_info=exc_info, extra={'method': method, 'body': message, 'fields': fields})
+
+    def add_info(self, method:str, message:str, **fields):
+        self._log(logging.INFO, method, message, fields)
 
-    def add_warning(self, method:str, message:str):
-        self.logger.warning(f'[{method}]: {message}')
+    def add_warning(self, method:str, message:str, **fields):
+        self._log(logging.WARNING, method, message, fields)
 
-    def add_error(self, method:str, message:str):
-        self.logger.error(f'[{method}]: {message}')
+    def add_error(self, method:str, message:str, **fields):
+        self._log(logging.ERROR, method, message, fields)
 
-    def add_exception(self, method:str, message:str):
-        self.logger.exception(f'[{method}]: {message}')
+    def add_exception(self, method:str, message:str, **fields):
+        self._log(logging.ERROR, method, message, fields, exc_info=True)
 
-    def add_critical(self, method:str, message:str):
-        self.logger.critical(f'[{method}]: {message}')
+    def add_critical(self, method:str, message:str, **fields):
+        self._log(logging.CRITICAL, method, message, fields)
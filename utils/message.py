@@ -1,7 +1,11 @@
-import time, requests
+import time, queue, random, threading, requests
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
+from utils import metrics
+
 # 슬랙 토큰과 채널 설정
 slack_token = "your-slack_token"
 channel_id = "your-slack-channel-id"
@@ -35,18 +39,184 @@ def send_telegram_message(bot_token, chat_id, message):
     except Exception as e:
         print(f"요청 중 에러 발생: {e}")
 
-def send_request_post(url:str, body:dict, auth_token:str=None):
-    try:
+completion_requests = metrics.registry.counter('completion_requests_total', 'Completion callback POST attempts by result.', ('result',))
+
+class CompletionError(Exception):
+    def __init__(self, message:str, status_code:int=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CompletionClient:
+    RETRY_STATUS = (408, 425, 429, 500, 502, 503, 504)
+
+    def __init__(self, auth_token:str=None, connect_timeout_sec:float=3.05, read_timeout_sec:float=10, max_retries:int=3,
+                 backoff_base_sec:float=0.5, backoff_max_sec:float=10, pool_size:int=8, senders:int=4,
+                 batch_size:int=1, batch_wait_sec:float=0.05, max_pending:int=1000):
+        """
+        완료 콜백 전송 클라이언트. Session으로 keep-alive 연결을 재사용하고, timeout과 jitter를 준 재시도를 적용.
+        submit은 백그라운드 전송 스레드에 맡기고 바로 Future를 반환하므로 추론 스레드를 막지 않음.
+
+        :param max_retries: 연결 오류, timeout, 408/429/5xx 응답일 때 추가로 시도할 횟수.
+        :param pool_size: 호스트별로 유지할 최대 연결 수.
+        :param senders: submit된 요청을 전송하는 백그라운드 스레드 수.
+        :param batch_size: 1보다 크면 같은 URL로 가는 결과를 최대 batch_size개까지 모아서 JSON 배열 하나로 POST.
+        :param batch_wait_sec: 배치를 채우기 위해 첫 결과 이후 기다리는 최대 시간.
+        :param max_pending: 전송 대기열 크기. 가득 차면 submit이 대기.
+        """
+        self.auth_token = auth_token
+        self.timeout = (connect_timeout_sec, read_timeout_sec)
+        self.max_retries = max_retries
+        self.backoff_base_sec = backoff_base_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.senders = max(1, senders)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_sec = batch_wait_sec
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def post(self, url:str, body, auth_token:str=None):
+        """
+        body를 JSON으로 POST하고, 2xx 응답이 올 때까지 재시도.
+
+        :return: 응답 객체.
+        :raises CompletionError: 재시도 후에도 실패하거나 재시도할 수 없는 응답(4xx)을 받은 경우.
+        """
         headers = {
             "Content-Type": "application/json",
-            "AI-Authentification": auth_token
+            "AI-Authentification": auth_token or self.auth_token
         }
-        response = requests.post(url,
-                                 headers=headers,
-                                 json=body)
-        if response.status_code == 200:
-            return True
-        else:
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"POST 요청 중 오류 발생: {e}")
\ No newline at end of file
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                with metrics.timer('completion.post'):
+                    response = self.session.post(url, headers=headers, json=body, timeout=self.timeout)
+                if 200 <= response.status_code < 300:
+                    completion_requests.inc(result='success')
+                    return response
+                error = CompletionError(f"POST {url} returned {response.status_code}: {response.text[:200]}", response.status_code)
+                if response.status_code not in self.RETRY_STATUS:
+                    completion_requests.inc(result='failed')
+                    raise error
+                retry_after = response.headers.get("Retry-After")
+            except requests.exceptions.RequestException as e:
+                error = CompletionError(f"POST {url} failed: {e}")
+
+            if attempt == self.max_retries:
+                break
+            completion_requests.inc(result='retry')
+            time.sleep(self._backoff(attempt, retry_after))
+
+        completion_requests.inc(result='failed')
+        raise error
+
+    def _backoff(self, attempt:int, retry_after:str=None) -> float:
+        if retry_after is not None:
+            try:
+                return min(self.backoff_max_sec, float(retry_after))
+            except ValueError:
+                pass
+        # full jitter: 여러 worker가 같은 시점에 실패해도 재시도가 한꺼번에 몰리지 않도록 함
+        return random.uniform(0, min(self.backoff_max_sec, self.backoff_base_sec * (2 ** attempt)))
+
+    def submit(self, url:str, body) -> Future:
+        """
+        전송을 백그라운드 스레드에 맡기고 Future를 반환. 전송이 끝나면 응답 객체, 실패하면 CompletionError가 Future에 설정됨.
+        """
+        self._ensure_started()
+        future = Future()
+        self._pending.put((url, body, future))
+        return future
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("CompletionClient is closed.")
+            if not self._threads:
+                self._threads = [threading.Thread(target=self._send_loop, name=f'completion-sender-{index}', daemon=True)
+                                 for index in range(self.senders)]
+                for thread in self._threads:
+                    thread.start()
+
+    def _send_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            if self.batch_size > 1:
+                deadline = time.monotonic() + self.batch_wait_sec
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+
+            groups = {}
+            for url, body, future in batch:
+                groups.setdefault(url, []).append((body, future))
+            for url, items in groups.items():
+                self._send_group(url, items)
+            if stop:
+                return
+
+    def _send_group(self, url:str, items:list):
+        # 취소된 Future는 제외
+        items = [(body, future) for body, future in items if future.set_running_or_notify_cancel()]
+        if not items:
+            return
+        body = items[0][0] if self.batch_size == 1 else [body for body, _ in items]
+        try:
+            response = self.post(url, body)
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for _, future in items:
+            future.set_result(response)
+
+    def close(self):
+        """
+        대기 중인 요청을 모두 전송한 뒤 전송 스레드와 연결을 정리.
+        """
+        with self._lock:
+            self._closed = True
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._pending.put(None)
+        for thread in threads:
+            thread.join()
+        self.session.close()
+
+_default_client = None
+
+def get_completion_client() -> CompletionClient:
+    global _default_client
+    if _default_client is None:
+        _default_client = CompletionClient()
+    return _default_client
+
+def send_request_post(url:str, body:dict, auth_token:str=None):
+    """
+    공유 CompletionClient로 POST를 보내고 성공 여부를 반환 (연결 재사용, timeout, 재시도 포함).
+    """
+    try:
+        get_completion_client().post(url, body, auth_token=auth_token)
+        return True
+    except CompletionError as e:
+        print(f"POST 요청 중 오류 발생: {e}")
+        return False
@@ -0,0 +1,98 @@
+import os, gc, sys, time, signal, socket
+
+import uvicorn
+
+def create_listen_socket(host:str, port:int, backlog:int=2048) -> socket.socket:
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def _serve_child(app, sock:socket.socket, workers:int, log_level:str):
+    # 부모의 시그널 핸들러를 초기화하고 uvicorn이 직접 처리하도록 함
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # worker끼리 CPU를 나눠 쓰도록 torch 연산 스레드 수 조정
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def run_prefork(app, host:str, port:int, workers:int, preload:callable=None, log_level:str='info'):
+    """
+    부모 프로세스에서 모델을 한 번 로드한 뒤 worker를 fork해서 가중치를 copy-on-write로 공유하는 서버 실행.
+    모든 worker가 같은 listen 소켓에서 accept하므로 연결은 커널이 worker 사이에 분배함.
+    죽은 worker는 부모가 다시 fork함.
+
+    CUDA는 fork 이후 자식 프로세스에서 사용할 수 없으므로 CPU 추론 서버에서 사용.
+
+    :param app: ASGI 앱 객체.
+    :param workers: fork할 worker 수 (hp.server_workers).
+    :param preload: fork 전에 부모에서 호출할 함수 (예: 모델 warm-up). 스레드를 남기지 않아야 함.
+    """
+    sock = create_listen_socket(host, port)
+    if preload is not None:
+        preload()
+
+    # 로드된 객체를 GC 대상에서 제외해서 자식의 GC가 공유 페이지를 건드려 복사되지 않도록 함
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(index:int):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                _serve_child(app, sock, workers, log_level)
+            except BaseException as e:
+                print(f"worker {index} 종료: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = (index, time.monotonic())
+        print(f"worker {index} 시작 (pid: {pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid not in children:
+            continue
+
+        index, started = children.pop(pid)
+        if stopping:
+            continue
+        print(f"worker {index} 비정상 종료 (pid: {pid}, status: {status}). 재시작합니다.")
+        # 시작 직후 바로 죽는 경우 재시작이 과도하게 반복되지 않도록 잠시 대기
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)
+        spawn(index)
+
+    sock.close()
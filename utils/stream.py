@@ -0,0 +1,197 @@
+import os, struct, asyncio, threading
+
+import numpy as np
+
+from pathlib import Path
+from urllib.parse import quote
+from email.utils import formatdate
+
+from fastapi import Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+def make_etag(stat:os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+def parse_range_header(range_header:str, file_size:int):
+    """
+    'bytes=start-end' 형태의 단일 Range 헤더를 (start, end) 바이트 구간으로 변환.
+    여러 구간을 요청하거나 형식이 맞지 않으면 None을 반환해서 전체 파일을 응답하도록 함.
+    """
+    if not range_header or not range_header.startswith('bytes=') or ',' in range_header:
+        return None
+
+    start_str, _, end_str = range_header[len('bytes='):].strip().partition('-')
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+        else:
+            # bytes=-N: 마지막 N 바이트
+            suffix_length = int(end_str)
+            if suffix_length == 0:
+                raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+            start = max(0, file_size - suffix_length)
+            end = file_size - 1
+    except ValueError:
+        return None
+
+    # last-byte-pos가 first-byte-pos보다 작으면 문법 오류이므로 헤더를 무시 (RFC 7233 2.1)
+    if start_str and end_str and start > end:
+        return None
+    if start >= file_size:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+    return start, min(end, file_size - 1)
+
+def iter_file_range(file_path:str, start:int, end:int, chunk_size:int=CHUNK_SIZE):
+    """
+    파일의 [start, end] 구간을 chunk_size 단위로 읽어서 반환. 메모리 사용량은 파일 크기와 무관.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def file_stream_response(request:Request, file_path:Path, media_type:str, filename:str=None, disposition:str='attachment', chunk_size:int=CHUNK_SIZE) -> Response:
+    """
+    파일을 고정 크기 청크로 스트리밍하는 응답 생성. Range(206)와 ETag/If-None-Match(304)를 지원.
+
+    :param request: Range, If-None-Match, If-Range 헤더를 읽을 요청 객체.
+    :param file_path: 응답할 파일 경로.
+    :param media_type: 응답 Content-Type.
+    :param filename: Content-Disposition에 사용할 파일 이름. None이면 file_path의 이름 사용.
+    :param disposition: 'inline' (브라우저/플레이어에서 바로 재생) 또는 'attachment' (다운로드).
+    """
+    file_path = str(file_path)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found.")
+
+    file_size = stat.st_size
+    etag = make_etag(stat)
+    filename = filename or os.path.basename(file_path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Content-Disposition": f"{disposition}; filename*=UTF-8''{quote(filename)}",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        byte_range = parse_range_header(request.headers.get("range"), file_size)
+
+    if byte_range is None:
+        start, end, status_code = 0, file_size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    headers["Content-Length"] = str(end - start + 1 if file_size else 0)
+
+    return StreamingResponse(iter_file_range(file_path, start, end, chunk_size),
+                             status_code=status_code,
+                             media_type=media_type,
+                             headers=headers)
+
+def wav_stream_header(sample_rate:int, channels:int=1, sample_width:int=2) -> bytes:
+    """
+    전체 길이를 모르는 스트리밍용 WAV 헤더. RIFF/data 크기는 최대값으로 채움.
+    """
+    byte_rate = sample_rate * channels * sample_width
+    return (b'RIFF' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8)
+            + b'data' + struct.pack('<I', 0xFFFFFFFF))
+
+def to_pcm16_bytes(chunk) -> bytes:
+    """
+    오디오 청크(-1~1 float 배열, int16 배열 또는 bytes)를 16bit PCM 바이트로 변환.
+    """
+    if isinstance(chunk, (bytes, bytearray)):
+        return bytes(chunk)
+    chunk = np.asarray(chunk)
+    if chunk.dtype != np.int16:
+        chunk = (np.clip(chunk, -1.0, 1.0) * 32767).astype(np.int16)
+    return chunk.tobytes()
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    응답이 끝나면 (클라이언트가 body를 읽기 전에 연결을 끊은 경우도 포함) release()를 호출하는 StreamingResponse.
+    generator 안의 finally는 iteration이 시작되지 않으면 실행되지 않으므로, 수용 슬롯 같은 자원은 여기서 반환.
+    """
+    def __init__(self, content, release:callable, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.release()
+
+async def iterate_in_thread(gen_fn:callable, *args, max_buffer:int=8, run:callable=asyncio.to_thread):
+    """
+    동기 generator를 별도 스레드에서 실행하고 결과를 비동기로 전달.
+    소비 쪽이 느리면 버퍼가 max_buffer개에서 멈추고 생산 쪽이 대기하므로 메모리가 무한히 늘지 않음.
+
+    :param gen_fn: 청크를 yield하는 함수. 스레드 안에서 gen_fn(*args)로 호출됨.
+    :param max_buffer: 소비되지 않은 청크를 최대 몇 개까지 쌓아 둘지.
+    :param run: 동기 함수를 실행할 비동기 함수 (예: InferenceExecutor.run).
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    credits = threading.Semaphore(max_buffer)
+    stop = threading.Event()
+    done = object()
+
+    def push(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # 이벤트 루프가 이미 닫힌 경우
+            pass
+
+    def produce():
+        error = None
+        try:
+            for chunk in gen_fn(*args):
+                while not credits.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                push((chunk, None))
+        except Exception as e:
+            error = e
+        finally:
+            push((done, error))
+
+    task = asyncio.ensure_future(run(produce))
+    try:
+        while True:
+            chunk, error = await queue.get()
+            if chunk is done:
+                if error is not None:
+                    raise error
+                break
+            credits.release()
+            yield chunk
+    finally:
+        # 클라이언트가 연결을 끊으면 생산 스레드도 멈추도록 함
+        stop.set()
+        try:
+            await task
+        except Exception:
+            pass
@@ -1,18 +1,30 @@
 import os, time, json, requests
 
-from utils.message import send_request_post
+from cores.AWSControler import SQSClient
+from cores.QueueBackend import VisibilityHeartbeat
+from cores.JobPipeline import JobPipeline
+from cores.JobDeduplicator import JobDeduplicator
+from utils.environment import hp, ap, service_logger
+from utils.message import CompletionClient
 
 job_prior_queue_url = ""
 job_queue_url = ""
+job_dead_letter_queue_url = ""
 prod_api_url = ""
 test_api_url = ""
 
 complete_api_key = ""
 
+# import만으로 AWS 연결, 스레드, SQLite 파일이 생기지 않도록 main()에서 생성
+sqs = None
+completion_client = None
+dedup = None
+
 def inference_task(item):
     """
     Input task funtions
     """
+    start = time.time()
     result = {
         "hash": item.hash,
         "is_test": item.is_test,
@@ -21,51 +33,95 @@ def inference_task(item):
 
     return result
 
+def handle_job(queue_url:str, message:dict):
+    task_body = json.loads(message["Body"])
+    task_item = ItemTextToSpeechWav.model_validate(task_body)
+    if dedup is None:
+        return task_item, inference_task(task_item)
 
-def poll_inf_job_queue():
-    while True:
-        response = sqs.recevie_message(job_prior_queue_url)
-        messages = response.get("Messages", [])
-        if messages:
-            for message in messages:
-                try:
-                    receipt_handle = message["ReceiptHandle"]
-                    task_body = json.loads(message["Body"])
-                    task_item = ItemTextToSpeechWav.model_validate(task_body)
-                    result = inference_task(task_item)
-
-                    url = test_api_url if task_item.is_test else prod_api_url
-                    send_stts_request_post(url, result, complete_api_key)
-
-                    sqs.delete_message(job_prior_queue_url, receipt_handle)
-                    stts_logger.add_info("inference_task", f"Task completed and pushed to completion queue: {result}")
-                except Exception as e:
-                    stts_logger.add_error("inference_task", f"Error while polling priority job queue: {e}")
-                    sqs.delete_message(job_prior_queue_url, receipt_handle)
-                    time.sleep(1)  # 에러 발생 시 큐삭제 후 다음작업 수행
-            continue            
-
-
-        response = sqs.recevie_message(job_queue_url)
-        messages = response.get("Messages", [])
-        if messages:
-            for message in messages:
-                try:
-                    receipt_handle = message["ReceiptHandle"]
-                    task_body = json.loads(message["Body"])
-                    task_item = ItemTextToSpeechWav.model_validate(task_body)
-                    result = inference_task(task_item)
-
-                    url = test_api_url if task_item.is_test else prod_api_url
-                    send_stts_request_post(url, result, complete_api_key)
-
-                    sqs.delete_message(job_queue_url, receipt_handle)
-                    stts_logger.add_info("inference_task", f"Task completed and pushed to completion queue: {result}")
-                except Exception as e:
-                    stts_logger.add_error("inference_task", f"Error while polling job queue: {e}")
-                    sqs.delete_message(job_queue_url, receipt_handle)
-                    time.sleep(1)  # 에러 발생 시 큐삭제 후 다음작업 수행
+    result, status = dedup.run(task_item.hash, inference_task, task_item)
+    if status != 'computed':
+        service_logger.add_info("inference_task", f"Duplicate job reused stored result: {task_item.hash}", status=status)
+    return task_item, result
 
-if __name__ == "__main__":
+def complete_job(queue_url:str, message:dict, output):
+    task_item, result = output
+    url = test_api_url if task_item.is_test else prod_api_url
+    service_logger.add_info("inference_task", f"Task completed and pushed to completion queue: {result}")
+    # 전송이 끝나면 JobPipeline이 Future 결과에 따라 메시지를 삭제하거나 재시도 처리
+    return completion_client.submit(url, result)
+
+def job_deadline(message:dict):
+    # 작업이 deadline(epoch 초)을 직접 가지고 있으면 큐 TTL보다 우선
+    return json.loads(message["Body"]).get("deadline")
+
+def expire_job(queue_url:str, message:dict):
+    task_body = json.loads(message["Body"])
+    result = {
+        "hash": task_body.get("hash"),
+        "is_test": task_body.get("is_test"),
+        "status": "expired"
+    }
+    url = test_api_url if task_body.get("is_test") else prod_api_url
+    service_logger.add_warning("inference_task", f"Job expired before inference: {result['hash']}")
+    return completion_client.submit(url, result)
+
+def fail_job(queue_url:str, message:dict, error:Exception):
+    # 삭제하지 않고 backoff 후 다시 받도록 하고, 계속 실패하면 dead-letter 큐로 이동
+    outcome = sqs.retry_or_dead_letter(queue_url, message,
+                                       dead_letter_queue_url=job_dead_letter_queue_url,
+                                       max_receive_count=hp.worker_max_receive_count,
+                                       base_delay_sec=hp.worker_retry_base_sec,
+                                       max_delay_sec=hp.worker_retry_max_sec)
+    service_logger.add_error("inference_task", f"Error while handling job from {queue_url}: {error}", outcome=outcome)
+    if outcome == 'exhausted':
+        service_logger.add_error("inference_task", f"Job exceeded {hp.worker_max_receive_count} receives and no dead-letter queue is configured; "
+                                 f"left on {queue_url} for its redrive policy: {message.get('MessageId')}")
+
+def build_pipeline() -> JobPipeline:
+    """
+    큐 클라이언트, 완료 전송 클라이언트, 중복 제거 저장소를 만들고 이를 사용하는 JobPipeline을 반환.
+    """
+    global sqs, completion_client, dedup
+
+    sqs = SQSClient()
+    # 완료 콜백은 keep-alive 연결을 재사용하는 백그라운드 스레드에서 전송
+    completion_client = CompletionClient(auth_token=complete_api_key,
+                                         read_timeout_sec=hp.worker_completion_timeout_sec,
+                                         max_retries=hp.worker_completion_max_retries,
+                                         senders=hp.worker_completion_workers,
+                                         batch_size=hp.worker_completion_batch_size,
+                                         batch_wait_sec=hp.worker_completion_batch_wait_ms / 1000)
+    # 같은 hash의 작업이 다시 들어오면 추론 없이 저장된 결과로 완료 처리
+    dedup = JobDeduplicator(db_path=str(ap.inner_output_path / 'worker_dedup.db'),
+                            ttl_sec=hp.worker_dedup_ttl_sec,
+                            memory_items=hp.worker_dedup_memory_items) if hp.worker_dedup_enable else None
+
+    # 수신(큐별 동시 polling + 가중치 스케줄링), 추론, 완료 전송/삭제가 각각 다른 스레드에서 동시에 진행됨
+    return JobPipeline(queue_client=sqs,
+                       queue_urls=[job_prior_queue_url, job_queue_url],
+                       handler=handle_job,
+                       completer=complete_job,
+                       on_error=fail_job,
+                       queue_weights=hp.worker_queue_weights,
+                       receive_batch_size=hp.worker_receive_batch_size,
+                       inference_workers=hp.worker_inference_workers,
+                       prefetch=hp.worker_prefetch,
+                       completion_workers=hp.worker_completion_workers,
+                       visibility_timeout=hp.worker_visibility_timeout,
+                       heartbeat=VisibilityHeartbeat(sqs, hp.worker_visibility_timeout, hp.worker_heartbeat_sec, logger=service_logger),
+                       job_ttl_sec=hp.worker_job_ttl_sec,
+                       deadline_fn=job_deadline,
+                       on_expired=expire_job,
+                       logger=service_logger)
+
+def main():
+    pipeline = build_pipeline()
     print("Starting inference worker...")
-    poll_inf_job_queue()
\ No newline at end of file
+    try:
+        pipeline.run()
+    finally:
+        completion_client.close()
+
+if __name__ == "__main__":
+    main()